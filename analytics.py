@@ -0,0 +1,256 @@
+import argparse
+import json
+import sys
+import time
+
+import numpy as np
+
+from catalog import Catalog
+from slots import DAYS
+from storage import open_store
+
+# python analytics.py                  -> text report for the whole cohort
+# python analytics.py --json out.json  -> the same numbers, machine-readable
+
+# occupancy is counted in CELL_MINUTES cells: a meeting holds every cell it touches
+# (08:00-08:50 holds 08:00 and 08:30), so rooms get their changeover time. student
+# clashes found on that grid are confirmed against the exact slots before reporting
+CELL_MINUTES = 30
+CELLS_PER_DAY = 24 * 60 // CELL_MINUTES
+TOP = 10  # rows per ranking in the report
+POPCOUNT = np.array([bin(n).count("1") for n in range(256)], dtype=np.uint8)
+
+
+def cell_label(day, cell):
+    minutes = cell * CELL_MINUTES
+    return f"{DAYS[day]} {minutes // 60:02d}:{minutes % 60:02d}"
+
+
+def label_of(flat_cell):
+    return cell_label(*divmod(int(flat_cell), CELLS_PER_DAY))
+
+
+# ==========================================
+# ARRAYS
+# ==========================================
+def course_cells(catalog):
+    # -> bool (courses, days, cells): course i meets during cell (d, c)
+    cells = np.zeros((len(catalog.courses), len(DAYS), CELLS_PER_DAY), dtype=bool)
+    for i, course in enumerate(catalog.courses):
+        for day, start, end in catalog.slots[course["code"]]:
+            cells[i, day, start // CELL_MINUTES : -(-end // CELL_MINUTES)] = True
+    return cells
+
+
+def registrations(students, catalog):
+    # -> (student position, course position) per registration, grouped by student;
+    # codes that aren't in the catalog are left out
+    counts = np.fromiter(
+        (len(s["registered_courses"]) for s in students), dtype=np.int64, count=len(students)
+    )
+    index = catalog.index
+    courses = np.fromiter(
+        (index.get(code, -1) for s in students for code in s["registered_courses"]),
+        dtype=np.int64,
+        count=int(counts.sum()),
+    )
+    owners = np.repeat(np.arange(len(students)), counts)
+    known = courses >= 0
+    return owners[known], courses[known]
+
+
+def room_totals(values, room_of, room_count):
+    # sums rows of `values` (one per course) into one row per room
+    order = np.argsort(room_of, kind="stable")
+    rooms, starts = np.unique(room_of[order], return_index=True)
+    totals = np.zeros((room_count,) + values.shape[1:], dtype=values.dtype)
+    if len(order):
+        totals[rooms] = np.add.reduceat(values[order], starts, axis=0)
+    return totals
+
+
+# ==========================================
+# ANALYSIS
+# ==========================================
+def analyse(courses, students, top=TOP):
+    catalog = Catalog(courses)
+    codes = [course["code"] for course in catalog.courses]
+    cells = course_cells(catalog)
+    flat_cells = cells.reshape(len(codes), -1)
+    owners, taken = registrations(students, catalog)
+
+    # enrollment and seats
+    enrollment = np.bincount(taken, minlength=len(codes))
+    capacity = np.array(
+        [course.get("capacity") or 0 for course in catalog.courses], dtype=np.int64
+    )
+    limited = np.flatnonzero(capacity)
+    fill = enrollment[limited] / capacity[limited]
+    over = limited[enrollment[limited] > capacity[limited]]
+
+    # cohort load: students sitting in a class, per cell
+    load = enrollment @ flat_cells
+    peak_cells = np.argsort(load, kind="stable")[::-1][:top]
+
+    # rooms: courses and students per room and cell
+    locations = [course.get("location", "") for course in catalog.courses]
+    rooms, room_of = np.unique(np.array(locations, dtype=object), return_inverse=True)
+    room_courses = room_totals(flat_cells.astype(np.int32), room_of, len(rooms))
+    room_students = room_totals(flat_cells * enrollment[:, None], room_of, len(rooms))
+    double = room_courses > 1
+    double_by_room = double.sum(axis=1)
+    in_use = (room_courses > 0).sum(axis=1)
+
+    # clashes: a student whose courses' cells add up to more than the cells they
+    # cover between them has two courses in one cell somewhere
+    clashing = []
+    if len(owners):
+        students_with, starts = np.unique(owners, return_index=True)
+        packed = np.packbits(flat_cells, axis=1)
+        per_course = POPCOUNT[packed].sum(axis=1, dtype=np.int64)
+        separate = np.add.reduceat(per_course[taken], starts)
+        combined = POPCOUNT[np.bitwise_or.reduceat(packed[taken], starts, axis=0)].sum(
+            axis=1, dtype=np.int64
+        )
+        clashing = students_with[separate > combined]
+    pairs = {}
+    confirmed = []
+    for n in clashing:
+        # exact check on the student's own slots: the cell grid rounds outwards
+        known = [c for c in students[n]["registered_courses"] if c in catalog.index]
+        found = False
+        for j, code in enumerate(known):
+            clash = catalog.find_clash(catalog.by_code[code], known[:j])
+            if clash:
+                pair = tuple(sorted((code, clash[0]["code"])))
+                pairs[pair] = pairs.get(pair, 0) + 1
+                found = True
+        if found:
+            confirmed.append(n)
+    hotspots = np.zeros(flat_cells.shape[1], dtype=np.int64)
+    if confirmed:
+        # students holding two courses in a cell, per cell
+        rows = np.isin(owners, confirmed)
+        per_cell = np.zeros((len(confirmed), flat_cells.shape[1]), dtype=np.int16)
+        np.add.at(per_cell, np.searchsorted(confirmed, owners[rows]), flat_cells[taken[rows]])
+        hotspots = (per_cell > 1).sum(axis=0)
+    hot_cells = [c for c in np.argsort(hotspots, kind="stable")[::-1][:top] if hotspots[c]]
+
+    def courses_in(room, cell):
+        return [codes[i] for i in np.flatnonzero((room_of == room) & flat_cells[:, cell])]
+
+    worst_rooms = np.argsort(double_by_room, kind="stable")[::-1][:top]
+    worst_rooms = [r for r in worst_rooms if double_by_room[r]]
+    busiest_rooms = np.argsort(room_students.max(axis=1), kind="stable")[::-1][:top]
+    fullest = np.argsort(fill, kind="stable")[::-1][:top]
+    return {
+        "students": len(students),
+        "registrations": int(len(taken)),
+        "courses": len(codes),
+        "rooms": len(rooms),
+        "cell_minutes": CELL_MINUTES,
+        "enrollment": {code: int(n) for code, n in zip(codes, enrollment)},
+        "over_capacity": [
+            {"code": codes[i], "enrolled": int(enrollment[i]), "capacity": int(capacity[i])}
+            for i in over
+        ],
+        "fullest": [
+            {
+                "code": codes[limited[i]],
+                "enrolled": int(enrollment[limited[i]]),
+                "capacity": int(capacity[limited[i]]),
+                "fill": round(float(fill[i]), 3),
+            }
+            for i in fullest
+        ],
+        "peak_load": [{"cell": label_of(c), "students": int(load[c])} for c in peak_cells],
+        "busiest_rooms": [
+            {
+                "room": rooms[r],
+                "peak_students": int(room_students[r].max()),
+                "at": label_of(room_students[r].argmax()),
+                "cells_in_use": int(in_use[r]),
+            }
+            for r in busiest_rooms
+        ],
+        "double_booked_cells": int(double.sum()),
+        "double_booked_rooms": [
+            {
+                "room": rooms[r],
+                "cells": int(double_by_room[r]),
+                "first": label_of(np.flatnonzero(double[r])[0]),
+                "courses": courses_in(r, np.flatnonzero(double[r])[0]),
+            }
+            for r in worst_rooms
+        ],
+        "clashing_students": len(confirmed),
+        "clash_hotspots": [{"cell": label_of(c), "students": int(hotspots[c])} for c in hot_cells],
+        "clashing_pairs": [
+            {"courses": list(pair), "students": n}
+            for pair, n in sorted(pairs.items(), key=lambda item: -item[1])[:top]
+        ],
+    }
+
+
+# ==========================================
+# REPORT
+# ==========================================
+def print_report(report, top=TOP):
+    print(
+        f"{report['students']} students, {report['registrations']} registrations, "
+        f"{report['courses']} courses in {report['rooms']} rooms "
+        f"({report['cell_minutes']}-minute cells)"
+    )
+    print("\nPeak load (students in class):")
+    for row in report["peak_load"]:
+        print(f"  {row['cell']:18} {row['students']}")
+    print("\nFullest courses:")
+    for row in report["fullest"]:
+        print(f"  {row['code']:10} {row['enrolled']}/{row['capacity']} ({row['fill']:.0%})")
+    print(f"\nOver capacity: {len(report['over_capacity'])} course(s)")
+    for row in report["over_capacity"][:top]:
+        print(f"  {row['code']:10} {row['enrolled']}/{row['capacity']}")
+    print("\nBusiest rooms:")
+    for row in report["busiest_rooms"]:
+        print(
+            f"  {row['room']:32} peak {row['peak_students']} at {row['at']}, "
+            f"{row['cells_in_use']} cells in use"
+        )
+    print(f"\nDouble-booked room cells: {report['double_booked_cells']}")
+    for row in report["double_booked_rooms"]:
+        print(
+            f"  {row['room']:32} {row['cells']} cells, first {row['first']}: "
+            f"{', '.join(row['courses'])}"
+        )
+    print(f"\nStudents with clashing courses: {report['clashing_students']}")
+    for row in report["clash_hotspots"]:
+        print(f"  {row['cell']:18} {row['students']} student(s)")
+    for row in report["clashing_pairs"]:
+        print(f"  {' x '.join(row['courses']):22} {row['students']} student(s)")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        prog="analytics", description="Room and time-slot utilization across all students."
+    )
+    parser.add_argument("--json", help="also write the report to this JSON file")
+    parser.add_argument("--top", type=int, default=TOP, help="rows per ranking")
+    args = parser.parse_args(argv)
+
+    started = time.perf_counter()
+    store = open_store()
+    courses = store.courses()
+    students = list(store.iter_students())
+    loaded = time.perf_counter()
+    report = analyse(courses, students, args.top)
+    done = time.perf_counter()
+    print_report(report, args.top)
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(report, f, indent=4)
+    print(f"\nLoaded in {loaded - started:.2f}s, analysed in {done - loaded:.2f}s")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
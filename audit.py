@@ -0,0 +1,234 @@
+import argparse
+import json
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from catalog import Catalog
+from rules import MAX_CREDITS, MIN_CREDITS, VALID_MATRIC, VALID_NAME, matric_error, name_error
+from storage import COURSES_FILE, STUDENTS_FILE, JsonStore, open_store
+
+# python audit.py                          -> checks every stored student, exit 1 on violations
+# python audit.py --report audit.jsonl     -> one violation per line instead of one document
+
+CHUNK = 5000  # students per task sent to a worker process
+IN_PROCESS_BELOW = 20000  # smaller cohorts are checked without starting a pool
+REPORT_FILE = "audit_report.json"
+# every rule a violation can name, in report order
+RULES = (
+    "record",  # not a student record at all (missing fields, wrong types)
+    "matric",
+    "duplicate_matric",
+    "name",
+    "unknown_course",
+    "duplicate_course",
+    "clash",
+    "credit_total",
+    "over_max",
+    "under_min",
+)
+
+
+# ==========================================
+# CHECKS (worker processes)
+# ==========================================
+# one pass per student: the compiled patterns settle the valid names and matrics
+# (nearly all of them) and only the rest go through the validators for a message;
+# clashes are a running OR of course bitmasks. duplicates across students are the
+# only cross-record rule, checked by the main process
+catalog = None
+credit_of = None  # code -> credits
+
+
+def init_worker(courses):
+    global catalog, credit_of
+    catalog = Catalog(courses)
+    credit_of = {course["code"]: course["credit"] for course in catalog}
+
+
+def audit_chunk(rows):
+    violations = []
+    for row in rows:
+        try:
+            violations += audit_student(*row)
+        except TypeError:  # e.g. a course entry that is a list, from a hand-edited file
+            violations.append((row[0], row[1], "record", "a field has the wrong type"))
+    return violations
+
+
+def audit_student(position, matric, name, codes, credits):
+    # -> [(position, matric, rule, detail)]
+    violations = []
+    if not VALID_MATRIC.fullmatch(matric):
+        detail = matric_error(matric) or "stored with lower case letters or spaces"
+        violations.append((position, matric, "matric", detail))
+    if not VALID_NAME.fullmatch(name.strip()):
+        violations.append((position, matric, "name", name_error(name)))
+
+    if len(set(codes)) != len(codes):
+        seen = set()
+        for code in codes:
+            if code in seen:
+                violations.append((position, matric, "duplicate_course", code))
+            seen.add(code)
+        codes = list(dict.fromkeys(codes))
+    masks = catalog.masks
+    taken = 0
+    total = 0
+    unknown = False
+    for n, code in enumerate(codes):
+        mask = masks.get(code)
+        if mask is None:
+            violations.append((position, matric, "unknown_course", str(code)))
+            unknown = True
+            continue
+        if mask & taken:
+            earlier = [c for c in codes[:n] if c in masks]
+            clash = catalog.find_clash(catalog.by_code[code], earlier)
+            if clash:
+                detail = f"{code} clashes with {clash[0]['code']}"
+                violations.append((position, matric, "clash", detail))
+        taken |= mask
+        total += credit_of[code]
+
+    if not unknown and total != credits:
+        violations.append(
+            (
+                position,
+                matric,
+                "credit_total",
+                f"total_credits is {credits} but registered courses add up to {total}",
+            )
+        )
+    if total > MAX_CREDITS:
+        detail = f"{total} credits, maximum {MAX_CREDITS}"
+        violations.append((position, matric, "over_max", detail))
+    if total < MIN_CREDITS:
+        detail = f"{total} credits, minimum {MIN_CREDITS}"
+        violations.append((position, matric, "under_min", detail))
+    return violations
+
+
+# ==========================================
+# DRIVER (main process)
+# ==========================================
+def student_row(position, student):
+    # -> (row for audit_student, None) or (None, why the record can't be checked)
+    try:
+        matric, name = student["matric"], student["name"]
+        codes, credits = student["registered_courses"], student["total_credits"]
+    except (KeyError, TypeError):
+        return None, "missing name, matric, registered_courses or total_credits"
+    if not (
+        isinstance(matric, str)
+        and isinstance(name, str)
+        and isinstance(codes, list)
+        and isinstance(credits, int)
+    ):
+        return None, "a field has the wrong type"
+    return (position, matric, name, codes, credits), None
+
+
+def audit_all(students, courses, jobs=None):
+    # -> [(position, matric, rule, detail)] sorted by position, then rule order
+    rows, violations = [], []
+    counts = {}
+    for position, student in enumerate(students):
+        row, problem = student_row(position, student)
+        if problem:
+            matric = student.get("matric") if isinstance(student, dict) else None
+            violations.append((position, str(matric or ""), "record", problem))
+            continue
+        rows.append(row)
+        counts[row[1]] = counts.get(row[1], 0) + 1
+    for position, matric, *_ in rows:
+        if counts[matric] > 1:
+            violations.append(
+                (position, matric, "duplicate_matric", f"{counts[matric]} records share it")
+            )
+
+    chunks = [rows[i : i + CHUNK] for i in range(0, len(rows), CHUNK)]
+    if len(rows) < IN_PROCESS_BELOW or jobs == 1:
+        init_worker(courses)
+        checked = map(audit_chunk, chunks)
+    else:
+        with ProcessPoolExecutor(jobs, initializer=init_worker, initargs=(courses,)) as pool:
+            checked = list(pool.map(audit_chunk, chunks))
+    for chunk_violations in checked:
+        violations += chunk_violations
+    order = {rule: n for n, rule in enumerate(RULES)}
+    violations.sort(key=lambda v: (v[0], order[v[2]]))
+    return violations
+
+
+def write_report(path, students, violations):
+    items = [
+        {"index": position, "matric": matric, "rule": rule, "detail": detail}
+        for position, matric, rule, detail in violations
+    ]
+    with open(path, "w") as f:
+        if path.endswith((".jsonl", ".ndjson")):
+            for item in items:
+                f.write(json.dumps(item) + "\n")
+            return
+        by_rule = {rule: 0 for rule in RULES}
+        for item in items:
+            by_rule[item["rule"]] += 1
+        report = {
+            "created": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "students": len(students),
+            "students_with_violations": len({item["index"] for item in items}),
+            "violations": len(items),
+            "by_rule": by_rule,
+            "items": items,
+        }
+        json.dump(report, f, indent=4)
+
+
+def load_students():
+    # -> (students, courses) through the store, journal included. a students.json the
+    # store can't load at all is read as it is on disk, so its broken records end up
+    # in the report instead of a traceback
+    try:
+        store = open_store()
+    except (KeyError, TypeError, AttributeError):
+        with open(STUDENTS_FILE, "r") as f:
+            students = json.load(f)
+        if not isinstance(students, list):
+            students = [students]
+        print(f"Warning: {STUDENTS_FILE} has broken records; checking the file as it is.")
+        return students, JsonStore(courses_path=COURSES_FILE).courses()
+    return list(store.iter_students()), store.courses()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        prog="audit", description="Check every stored student against the registration rules."
+    )
+    parser.add_argument(
+        "--report", default=REPORT_FILE, help=f"JSON or .jsonl output (default: {REPORT_FILE})"
+    )
+    parser.add_argument("--jobs", type=int, help="worker processes (default: one per CPU)")
+    args = parser.parse_args(argv)
+
+    started = time.perf_counter()
+    students, courses = load_students()
+    violations = audit_all(students, courses, args.jobs)
+    write_report(args.report, students, violations)
+
+    flagged = len({v[0] for v in violations})
+    by_rule = {}
+    for violation in violations:
+        by_rule[violation[2]] = by_rule.get(violation[2], 0) + 1
+    print(
+        f"{len(students)} students, {flagged} with violations "
+        f"in {time.perf_counter() - started:.2f}s. Report: {args.report}"
+    )
+    for rule in RULES:
+        if rule in by_rule:
+            print(f"  {rule:18} {by_rule[rule]}")
+    return 1 if violations else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
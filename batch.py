@@ -0,0 +1,263 @@
+import argparse
+import csv
+import json
+import os
+import re
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from catalog import Catalog
+from rules import add_error, matric_error, name_error
+from storage import open_store
+
+CHUNK = 2000  # students per task sent to a worker process
+IN_PROCESS_BELOW = 5000  # smaller batches are checked without starting a pool
+CODE_SEPARATORS = re.compile(r"[\s,;|]+")
+NOT_JSON = object()  # stands in for a JSON line that could not be parsed
+
+
+# ==========================================
+# INPUT
+# ==========================================
+# CSV with a header (matric, name, courses) or JSON lines ({"matric", "name", "courses"}).
+# name is only needed for students who are not registered yet; courses is a list
+# or a string of codes separated by spaces, commas, semicolons or |
+def read_requests(path):
+    rows = []
+    with open(path, "r", newline="") as f:
+        if path.endswith((".jsonl", ".ndjson")):
+            for line_no, line in enumerate(f, 1):
+                if line.strip():
+                    try:
+                        rows.append((line_no, json.loads(line)))
+                    except ValueError:
+                        rows.append((line_no, NOT_JSON))
+        else:
+            for line_no, record in enumerate(csv.DictReader(f), 2):  # line 1 is the header
+                rows.append((line_no, record))
+    return [parse_request(line_no, record) for line_no, record in rows]
+
+
+def parse_request(line_no, record):
+    # -> (line, matric, name, codes, error)
+    if record is NOT_JSON:
+        return (line_no, "", "", [], "not valid JSON")
+    if not isinstance(record, dict):
+        return (line_no, "", "", [], "not an object")
+    codes = record.get("courses") or []
+    if isinstance(codes, str):
+        codes = [c for c in CODE_SEPARATORS.split(codes) if c]
+    elif not isinstance(codes, list):
+        return (line_no, "", "", [], "courses must be a list or a string of codes")
+    return (
+        line_no,
+        str(record.get("matric") or "").strip().upper(),
+        str(record.get("name") or "").strip(),
+        [str(c) for c in codes],
+        None,
+    )
+
+
+# ==========================================
+# CHECKS (worker processes)
+# ==========================================
+# every row of one student lands in the same task, in file order, so each row is
+# checked against the registrations the rows before it would make. seat limits
+# are the only thing that spans students; the commit step handles those
+catalog = None
+
+
+def init_worker(courses):
+    global catalog
+    catalog = Catalog(courses)
+
+
+def check_chunk(groups):
+    return [check_group(*group) for group in groups]
+
+
+def check_group(matric, existing, rows):
+    # existing: (codes, credits) of the stored student, or None.
+    # -> [(line, new name or None, [accepted codes], [errors])]
+    student = None
+    if existing is not None:
+        codes, credits = existing
+        student = {"registered_courses": list(codes), "total_credits": credits}
+    results = []
+    for line_no, _, name, codes, error in rows:
+        if error:
+            results.append((line_no, None, [], [error]))
+            continue
+        error = matric_error(matric)
+        new_name = None
+        if error is None and student is None:
+            if not name:
+                error = "Student not found. Give a name to register them."
+            else:
+                error = name_error(name)
+                new_name = name.title()
+        if error:
+            results.append((line_no, None, [], [error]))
+            continue
+        if new_name:
+            student = {"registered_courses": [], "total_credits": 0}
+
+        accepted, errors = [], []
+        for query in codes:
+            course = catalog.lookup(query)
+            if course is None:
+                errors.append(f"{query}: course not found")
+                continue
+            if course["code"] in student["registered_courses"]:
+                errors.append(f"{course['code']}: already registered")
+                continue
+            error = add_error(student, course, catalog)
+            if error:
+                errors.append(error)
+                continue
+            student["registered_courses"].append(course["code"])
+            student["total_credits"] += course["credit"]
+            accepted.append(course["code"])
+        results.append((line_no, new_name, accepted, errors))
+    return results
+
+
+def check_all(requests, store, courses, jobs=None):
+    groups = {}
+    for request in requests:
+        groups.setdefault(request[1], []).append(request)
+    tasks = []
+    for matric, rows in groups.items():
+        student = store.get_student(matric) if matric else None
+        existing = None
+        if student is not None:
+            existing = (student["registered_courses"], student["total_credits"])
+        tasks.append((matric, existing, rows))
+    chunks = [tasks[i : i + CHUNK] for i in range(0, len(tasks), CHUNK)]
+
+    if len(requests) < IN_PROCESS_BELOW or jobs == 1:
+        init_worker(courses)
+        checked = list(map(check_chunk, chunks))
+    else:
+        with ProcessPoolExecutor(jobs, initializer=init_worker, initargs=(courses,)) as pool:
+            checked = list(pool.map(check_chunk, chunks))
+    results = {}
+    for task_chunk, result_chunk in zip(chunks, checked):
+        for (matric, _, _), group_results in zip(task_chunk, result_chunk):
+            for line_no, new_name, accepted, errors in group_results:
+                results[line_no] = (matric, new_name, accepted, errors)
+    return results
+
+
+# ==========================================
+# COMMIT (main process, one write)
+# ==========================================
+# rows are applied in file order against live seat counts; a full course (or one
+# with a queue) waitlists the student like an interactive add would
+def commit(results, store, courses):
+    by_code = {course["code"]: course for course in courses}
+    counts = store.enrollment_counts()
+    waitlists = store.waitlists()
+    report = []
+    for line_no in sorted(results):
+        matric, new_name, accepted, errors = results[line_no]
+        student = store.get_student(matric) if matric else None
+        if new_name and student is None:
+            student = {
+                "name": new_name,
+                "matric": matric,
+                "registered_courses": [],
+                "total_credits": 0,
+            }
+            store.register(student)
+        added, waitlisted = [], []
+        for code in accepted:
+            course = by_code[code]
+            capacity = course.get("capacity")
+            queue = waitlists.setdefault(code, [])
+            if capacity is not None and (queue or counts.get(code, 0) >= capacity):
+                if matric not in queue:
+                    queue.append(matric)
+                    store.join_waitlist(student, course)
+                waitlisted.append(code)
+            else:
+                counts[code] = counts.get(code, 0) + 1
+                store.add_course(student, course)
+                added.append(code)
+        report.append((line_no, matric, added, waitlisted, errors))
+    store.checkpoint()  # the one write; close() would only rewrite the same snapshot
+    return report
+
+
+def write_report(path, report):
+    with open(path, "w", newline="") as f:
+        if path.endswith((".jsonl", ".ndjson")):
+            for line_no, matric, added, waitlisted, errors in report:
+                record = {
+                    "line": line_no,
+                    "matric": matric,
+                    "status": "error" if errors else "ok",
+                    "added": added,
+                    "waitlisted": waitlisted,
+                    "errors": errors,
+                }
+                f.write(json.dumps(record) + "\n")
+            return
+        writer = csv.writer(f)
+        writer.writerow(["line", "matric", "status", "added", "waitlisted", "errors"])
+        for line_no, matric, added, waitlisted, errors in report:
+            writer.writerow(
+                [
+                    line_no,
+                    matric,
+                    "error" if errors else "ok",
+                    " ".join(added),
+                    " ".join(waitlisted),
+                    " | ".join(errors),
+                ]
+            )
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        prog="batch",
+        description="Register students and add courses in bulk from a CSV or JSONL file.",
+    )
+    parser.add_argument("requests", help="CSV (matric,name,courses) or .jsonl file")
+    parser.add_argument(
+        "--report", help="per-row results, CSV or .jsonl (default: <requests>.report.csv)"
+    )
+    parser.add_argument("--jobs", type=int, help="worker processes (default: one per CPU)")
+    parser.add_argument(
+        "--dry-run", action="store_true", help="check and report without saving anything"
+    )
+    args = parser.parse_args(argv)
+    report_path = args.report or os.path.splitext(args.requests)[0] + ".report.csv"
+
+    started = time.perf_counter()
+    requests = read_requests(args.requests)
+    store = open_store()
+    store.autoflush = False  # everything goes out in store.checkpoint()
+    courses = store.courses()
+    results = check_all(requests, store, courses, args.jobs)
+    if args.dry_run:
+        report = [
+            (line_no, matric, accepted, [], errors)
+            for line_no, (matric, _, accepted, errors) in sorted(results.items())
+        ]
+    else:
+        report = commit(results, store, courses)
+    write_report(report_path, report)
+
+    failed = sum(1 for row in report if row[4])
+    print(
+        f"{len(report)} rows, {len(report) - failed} ok, {failed} with errors"
+        f"{' (dry run, nothing saved)' if args.dry_run else ''} "
+        f"in {time.perf_counter() - started:.2f}s. Report: {report_path}"
+    )
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,373 @@
+import argparse
+import itertools
+import json
+import os
+import platform
+import random
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+from catalog import Catalog
+from datagen import dataset_dir, write_dataset
+from registration import Registry, Session
+from rules import check_student
+from solver import best_timetables
+from storage import JsonStore, SqliteStore
+
+# python bench.py run --size small            -> timings, saved as JSON
+# python bench.py compare old.json new.json   -> exit 1 when something got slower
+
+SIZES = {  # (courses, students); 10000 students is every valid matric (datagen.MAX_STUDENTS)
+    "tiny": (200, 1000),
+    "small": (1000, 10000),
+    "medium": (10000, 10000),
+    "large": (100000, 10000),
+}
+MIN_SAMPLE = 0.05  # micro benchmarks loop until one sample takes at least this long
+REPEAT = 5  # samples per micro benchmark; the median is what gets compared
+MACRO_REPEAT = 3
+CONFLICT_GRAPH_LIMIT = 20000  # courses; above this the bitset graph no longer fits in memory
+THRESHOLD = 0.10  # compare: slower by more than this fraction counts as a regression
+
+
+# ==========================================
+# DATASET
+# ==========================================
+class Dataset:
+    def __init__(self, size, seed):
+        self.size = size
+        self.seed = seed
+        self.course_count, self.student_count = SIZES[size]
+        self.directory = dataset_dir(self.course_count, self.student_count, seed)
+        self.courses_path, self.students_path = write_dataset(
+            self.directory, self.course_count, self.student_count, seed
+        )
+        with open(self.courses_path, "r") as f:
+            self.courses = json.load(f)
+        with open(self.students_path, "r") as f:
+            self.students = json.load(f)
+        self.catalog = Catalog(self.courses)
+        self.rng = random.Random(seed)
+        self.tmp = tempfile.mkdtemp(prefix="bench-")
+
+    def sample_students(self, count=1000):
+        return [self.rng.choice(self.students) for _ in range(count)]
+
+    def sample_courses(self, count=1000):
+        return [self.rng.choice(self.catalog.courses) for _ in range(count)]
+
+    def json_store(self, name, **options):
+        # reads the dataset; anything it writes (journal, snapshot, waitlists) goes to tmp
+        store = JsonStore(
+            self.students_path,
+            os.path.join(self.tmp, name + ".journal"),
+            self.courses_path,
+            waitlist_path=os.path.join(self.tmp, name + ".waitlists.json"),
+            **options,
+        )
+        store.load()
+        store.path = os.path.join(self.tmp, name + ".json")
+        return store
+
+    def close(self):
+        shutil.rmtree(self.tmp, ignore_errors=True)
+
+
+# ==========================================
+# BENCHMARKS
+# ==========================================
+# each one takes the Dataset and returns the function to time (or None to skip).
+# micro: timed per call, many calls per sample. macro: one call per sample
+BENCHMARKS = []
+
+
+def benchmark(kind, name):
+    def register(setup):
+        BENCHMARKS.append((f"{kind}/{name}", kind, setup))
+        return setup
+
+    return register
+
+
+def cycling(items, func):
+    # a zero-argument callable that applies func to the next item on each call
+    items = itertools.cycle(items)
+    return lambda: func(next(items))
+
+
+@benchmark("micro", "catalog.lookup")  # exact code, as typed at the add/drop prompt
+def bench_lookup(data):
+    return cycling([c["code"] for c in data.sample_courses()], data.catalog.lookup)
+
+
+@benchmark("micro", "catalog.search")  # partial code / name fragment
+def bench_search(data):
+    queries = []
+    for course in data.sample_courses(200):
+        word = data.rng.choice(course["name"].split())
+        queries += [course["code"][:6], word[: max(3, len(word) // 2)]]
+    data.catalog.search("warm")  # index build belongs to macro/catalog.search_index
+    return cycling(queries, data.catalog.search)
+
+
+@benchmark("micro", "catalog.search_short")  # under NGRAM characters: a linear scan
+def bench_search_short(data):
+    data.catalog.search("warm")
+    return cycling([c["code"][-2:] for c in data.sample_courses(200)], data.catalog.search)
+
+
+@benchmark("micro", "catalog.find_clash")
+def bench_find_clash(data):
+    pairs = list(zip(data.sample_courses(), data.sample_students()))
+    catalog = data.catalog
+    return cycling(pairs, lambda p: catalog.find_clash(p[0], p[1]["registered_courses"]))
+
+
+@benchmark("micro", "catalog.fitting")  # the CLI's "available courses" list
+def bench_fitting(data):
+    if data.course_count > CONFLICT_GRAPH_LIMIT:
+        return None
+    data.catalog.conflicts  # built once, timed in macro/catalog.conflict_graph
+    catalog = data.catalog
+    return cycling(data.sample_students(200), lambda s: catalog.fitting(s["registered_courses"]))
+
+
+@benchmark("micro", "session.timetable")
+def bench_timetable(data):
+    registry = Registry(None, data.catalog)
+    sessions = [Session(registry, s) for s in data.sample_students(200)]
+    return cycling(sessions, Session.timetable)
+
+
+@benchmark("micro", "rules.check_student")
+def bench_check_student(data):
+    return cycling(data.sample_students(), lambda s: check_student(s, data.catalog))
+
+
+@benchmark("macro", "catalog.build")
+def bench_catalog_build(data):
+    return lambda: Catalog(data.courses)
+
+
+@benchmark("macro", "catalog.conflict_graph")
+def bench_conflict_graph(data):
+    if data.course_count > CONFLICT_GRAPH_LIMIT:
+        return None
+    return data.catalog.build_conflicts
+
+
+@benchmark("macro", "catalog.search_index")
+def bench_search_index(data):
+    return data.catalog.build_search_index
+
+
+@benchmark("macro", "solver.best_timetables")  # full search over 24 candidate courses
+def bench_solver(data):
+    if data.course_count > CONFLICT_GRAPH_LIMIT:
+        return None
+    data.catalog.conflicts
+    optional = [c["code"] for c in data.sample_courses(24)]
+    return lambda: best_timetables(data.catalog, (), optional)
+
+
+@benchmark("macro", "store.load")  # load_data: snapshot + journal + catalog
+def bench_load(data):
+    def load():
+        store = data.json_store("load")
+        Catalog(store.courses())
+
+    return load
+
+
+@benchmark("macro", "store.compact")  # save_data
+def bench_compact(data):
+    return data.json_store("compact").compact
+
+
+def add_drop_cycle(data, store, students):
+    # add a course that fits and drop it again, so the store ends where it started
+    pairs = []
+    for student in students:
+        for course in data.sample_courses(20):
+            codes = student["registered_courses"]
+            if course["code"] not in codes and not data.catalog.find_clash(course, codes):
+                pairs.append((student, course))
+                break
+
+    def cycle(pair):
+        store.add_course(*pair)
+        store.drop_course(*pair)
+
+    return cycling(pairs, cycle)
+
+
+@benchmark("micro", "journal.add_drop")  # two fsync'd journal records
+def bench_journal(data):
+    store = data.json_store("journal", compact_every=10**9)
+    students = [store.get_student(s["matric"]) for s in data.sample_students(100)]
+    return add_drop_cycle(data, store, students)
+
+
+@benchmark("micro", "sqlite.add_drop")  # two committed transactions
+def bench_sqlite(data):
+    store = SqliteStore(os.path.join(data.tmp, "registration.db"))
+    cwd = os.getcwd()
+    os.chdir(data.tmp)  # load() auto-migrates JSON files from the working directory: none here
+    try:
+        store.load()
+    finally:
+        os.chdir(cwd)
+    store.migrate_json(
+        data.students_path,
+        data.courses_path,
+        os.path.join(data.tmp, "sqlite.journal"),
+        os.path.join(data.tmp, "sqlite.waitlists.json"),
+    )
+    students = [store.get_student(s["matric"]) for s in data.sample_students(100)]
+    return add_drop_cycle(data, store, students)
+
+
+# ==========================================
+# TIMING
+# ==========================================
+def run_one(func, kind, repeat):
+    # -> seconds per call over each sample, plus the calls per sample
+    if kind == "macro":
+        func()  # warm-up
+        samples = []
+        for _ in range(repeat):
+            started = time.perf_counter()
+            func()
+            samples.append(time.perf_counter() - started)
+        return samples, 1
+    number = 1
+    while True:
+        started = time.perf_counter()
+        for _ in range(number):
+            func()
+        elapsed = time.perf_counter() - started
+        if elapsed >= MIN_SAMPLE:
+            break
+        number *= 2 if elapsed > MIN_SAMPLE / 10 else 10
+    samples = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        for _ in range(number):
+            func()
+        samples.append((time.perf_counter() - started) / number)
+    return samples, number
+
+
+def git_commit():
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+
+
+def format_seconds(seconds):
+    for unit, scale in (("s", 1), ("ms", 1e-3), ("us", 1e-6)):
+        if seconds >= scale:
+            return f"{seconds / scale:8.2f} {unit}"
+    return f"{seconds / 1e-9:8.2f} ns"
+
+
+def run(args):
+    data = Dataset(args.size, args.seed)
+    results = {}
+    try:
+        for name, kind, setup in BENCHMARKS:
+            if args.filter and args.filter not in name:
+                continue
+            func = setup(data)
+            if func is None:
+                print(f"{name:32} skipped at this size")
+                continue
+            repeat = args.repeat or (MACRO_REPEAT if kind == "macro" else REPEAT)
+            samples, number = run_one(func, kind, repeat)
+            results[name] = {
+                "median": statistics.median(samples),
+                "min": min(samples),
+                "max": max(samples),
+                "calls": number * len(samples),
+            }
+            median = format_seconds(results[name]["median"])
+            print(f"{name:32} {median}  (x{results[name]['calls']})")
+    finally:
+        data.close()
+
+    report = {
+        "meta": {
+            "commit": git_commit(),
+            "size": args.size,
+            "courses": data.course_count,
+            "students": data.student_count,
+            "seed": args.seed,
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "created": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        },
+        "results": results,
+    }
+    output = args.output or os.path.join(
+        ".cache", "bench", f"results-{args.size}-{report['meta']['commit']}.json"
+    )
+    os.makedirs(os.path.dirname(output) or ".", exist_ok=True)
+    with open(output, "w") as f:
+        json.dump(report, f, indent=4)
+    print(f"Results written to {output}")
+    return 0
+
+
+def compare(args):
+    with open(args.base, "r") as f:
+        base = json.load(f)
+    with open(args.new, "r") as f:
+        new = json.load(f)
+    if base["meta"]["size"] != new["meta"]["size"]:
+        print(f"Warning: comparing size {base['meta']['size']} with {new['meta']['size']}")
+    print(f"{'benchmark':32} {base['meta']['commit']:>11} {new['meta']['commit']:>11}  change")
+    regressions = 0
+    for name in sorted(base["results"].keys() & new["results"].keys()):
+        old_time = base["results"][name]["median"]
+        new_time = new["results"][name]["median"]
+        change = new_time / old_time - 1
+        flag = ""
+        if change > args.threshold:
+            flag = "  REGRESSION"
+            regressions += 1
+        print(
+            f"{name:32} {format_seconds(old_time)} {format_seconds(new_time)}"
+            f"  {change:+7.1%}{flag}"
+        )
+    print(f"{regressions} regression(s) above {args.threshold:.0%}")
+    return 1 if regressions else 0
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        prog="bench", description="Benchmarks for the registration hot paths."
+    )
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    run_parser = subparsers.add_parser("run", help="run the benchmarks on a synthetic dataset")
+    run_parser.add_argument("--size", choices=SIZES, default="small")
+    run_parser.add_argument("--seed", type=int, default=0)
+    run_parser.add_argument("--filter", help="only benchmarks whose name contains this")
+    run_parser.add_argument("--repeat", type=int, help="samples per benchmark")
+    run_parser.add_argument("--output", help="results file (default: under .cache/bench)")
+    compare_parser = subparsers.add_parser("compare", help="compare two results files")
+    compare_parser.add_argument("base")
+    compare_parser.add_argument("new")
+    compare_parser.add_argument("--threshold", type=float, default=THRESHOLD)
+    args = parser.parse_args(argv)
+    return run(args) if args.command == "run" else compare(args)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,322 @@
+import bisect
+import sys
+from array import array
+
+from metrics import timed
+from slots import SLOT_MINUTES, overlapping_slot, parse_slots, slots_mask
+
+
+NGRAM = 3  # queries at least this long go through the n-gram index
+
+
+def search_key(course):
+    # the newline keeps a query from matching across the code/name boundary
+    return course["code"].upper() + "\n" + course["name"].upper()
+
+
+def ngrams_of(key):
+    grams = {key[j : j + NGRAM] for j in range(len(key) - NGRAM + 1)}
+    return {gram for gram in grams if "\n" not in gram}
+
+
+def bit_indices(bits):
+    # positions of the set bits, lowest first
+    return [i for i, ch in enumerate(reversed(bin(bits)[2:])) if ch == "1"]
+
+
+# ==========================================
+# COURSE CATALOG
+# ==========================================
+# the single copy of every course; students only keep course codes and
+# resolve them through here
+class Catalog:
+    def __init__(self, courses, granularity=SLOT_MINUTES):
+        # granularity: minutes per mask bit. coarser masks are smaller and quicker to
+        # build, and every mask hit is confirmed against the exact minutes anyway
+        self.granularity = granularity
+        self.courses = []
+        self.by_code = {}
+        self.slots = {}  # code -> ((day_index, start_min, end_min), ...)
+        self.masks = {}  # code -> occupancy bitmask, see slots.py
+        self.index = {}  # code -> bit position of the course in conflict bitsets
+        self.version = 0  # bumped whenever the course data changes, for render caches
+        self.holes = 0  # positions left empty (None) by removed courses, see apply_changes
+        self._conflicts = None
+        self._keys = None  # normalized "CODE\nNAME" per course, built with the n-gram index
+        self._ngrams = None
+        for course in courses:
+            code = course["code"] = sys.intern(course["code"])
+            self.index[code] = len(self.courses)
+            self.courses.append(course)
+            self.by_code[code] = course
+            self.slots[code] = parse_slots(course)
+            self.masks[code] = slots_mask(self.slots[code], granularity)
+
+    def __len__(self):
+        return len(self.by_code)
+
+    def __iter__(self):
+        if self.holes:
+            return (course for course in self.courses if course is not None)
+        return iter(self.courses)
+
+    def get(self, code):
+        return self.by_code.get(code)
+
+    def resolve(self, codes):
+        # codes that dropped out of courses.json are skipped rather than crashing the view
+        return [self.by_code[code] for code in codes if code in self.by_code]
+
+    # CLASH CHECKS
+    def mask_of(self, codes):
+        mask = 0
+        for code in codes:
+            mask |= self.masks.get(code, 0)
+        return mask
+
+    @timed("catalog_find_clash")
+    def find_clash(self, course, codes):
+        # (registered course, its clashing slot) or None
+        new_mask = self.masks[course["code"]]
+        if not new_mask & self.mask_of(codes):
+            return None
+        for code in codes:
+            if self.masks.get(code, 0) & new_mask:
+                # masks round outwards to the grid, so a shared bit may be back-to-back
+                # meetings in one cell rather than a real overlap
+                slot = overlapping_slot(self.slots[course["code"]], self.slots[code])
+                if slot:
+                    return self.by_code[code], slot
+        return None
+
+    # CONFLICT GRAPH
+    # conflicts[i] is a bitset of every course that clashes with course i. built on
+    # first use, and only again when the catalog itself changes
+    @property
+    def conflicts(self):
+        if self._conflicts is None:
+            self._conflicts = self.build_conflicts()
+        return self._conflicts
+
+    @timed("catalog_build_conflicts")
+    def build_conflicts(self):
+        # group courses by identical (day, start, end) slot first: a catalog has far
+        # fewer distinct slots than sections, so only the slots get compared pairwise
+        members = {}
+        for i, course in enumerate(self.courses):
+            if course is None:
+                continue
+            for slot in self.slots[course["code"]]:
+                members[slot] = members.get(slot, 0) | (1 << i)
+
+        by_day = {}
+        for slot in members:
+            by_day.setdefault(slot[0], []).append(slot)
+        reach = {}  # slot -> every course with a slot overlapping it
+        for day_slots in by_day.values():
+            for a in day_slots:
+                bits = 0
+                for b in day_slots:
+                    if max(a[1], b[1]) < min(a[2], b[2]):
+                        bits |= members[b]
+                reach[a] = bits
+
+        conflicts = []
+        for i, course in enumerate(self.courses):
+            bits = 0
+            for slot in self.slots[course["code"]] if course is not None else ():
+                bits |= reach[slot]
+            conflicts.append(bits & ~(1 << i))
+        return conflicts
+
+    def bits_of(self, codes):
+        bits = 0
+        for code in codes:
+            if code in self.index:
+                bits |= 1 << self.index[code]
+        return bits
+
+    @timed("catalog_fitting")
+    def fitting(self, codes, credit_room=None):
+        # every course that can still be added next to `codes`, in catalog order
+        taken = self.bits_of(codes)
+        blocked = taken
+        conflicts = self.conflicts
+        for i in bit_indices(taken):
+            blocked |= conflicts[i]
+        blocked_set = set(bit_indices(blocked))
+        return [
+            course
+            for i, course in enumerate(self.courses)
+            if course is not None
+            and i not in blocked_set
+            and (credit_room is None or course["credit"] <= credit_room)
+        ]
+
+    def blocked_codes(self, codes):
+        # codes of courses that clash with something in `codes`
+        blocked = 0
+        conflicts = self.conflicts
+        for i in bit_indices(self.bits_of(codes)):
+            blocked |= conflicts[i]
+        return {self.courses[i]["code"] for i in bit_indices(blocked)}
+
+    # SEARCH
+    # every NGRAM-long substring of a course's code and name maps to the (sorted)
+    # positions of the courses containing it. a query only needs the shortest
+    # posting list among its n-grams; each candidate is then confirmed with one
+    # substring test against its precomputed key
+    @timed("catalog_build_search_index")
+    def build_search_index(self):
+        keys = [search_key(course) if course is not None else "" for course in self.courses]
+        ngrams = {}
+        for i, key in enumerate(keys):
+            for gram in ngrams_of(key):
+                ngrams.setdefault(gram, array("i")).append(i)
+        self._keys, self._ngrams = keys, ngrams
+
+    @timed("catalog_lookup")
+    def lookup(self, query):
+        # exact code, or the SAIA 4-digit shortcut (1113 -> SAIA1113)
+        query = query.strip().upper()
+        course = self.by_code.get(query)
+        if course is None and len(query) == 4 and query.isdigit():
+            course = self.by_code.get("SAIA" + query)
+        return course
+
+    @timed("catalog_search")
+    def search(self, query):
+        # courses whose code or name contains `query`, in catalog order
+        query = query.strip().upper()
+        if not query:
+            return list(self)
+        if self._ngrams is None:
+            self.build_search_index()
+        keys = self._keys
+        if len(query) < NGRAM:
+            return [c for c, key in zip(self.courses, keys) if query in key]
+        shortest = None
+        for j in range(len(query) - NGRAM + 1):
+            postings = self._ngrams.get(query[j : j + NGRAM])
+            if postings is None:
+                return []
+            if shortest is None or len(postings) < len(shortest):
+                shortest = postings
+        return [self.courses[i] for i in shortest if query in keys[i]]
+
+    # HOT RELOAD
+    # apply_changes moves the catalog onto a new courses.json in place. a changed
+    # course gets its new dict swapped in (never edited, so other threads reading the
+    # old one see it whole) and keeps its bit position; a removed course leaves a None
+    # hole, so no other position moves and the conflict graph and n-gram postings are
+    # patched rather than rebuilt
+    @timed("catalog_apply_changes")
+    def apply_changes(self, courses):
+        # -> (added, removed, changed, moved) codes; moved: changed courses whose
+        # meeting times are different now. raises before touching anything when a
+        # course in `courses` can't be parsed
+        new = {}
+        for course in courses:
+            code = course["code"] = sys.intern(course["code"])
+            if not isinstance(course.get("name"), str) or not isinstance(course.get("credit"), int):
+                raise ValueError(f"{code}: a course needs a name and a whole number of credits")
+            try:
+                slots = parse_slots(course)
+            except (AttributeError, TypeError, ValueError):  # e.g. ["Monday", 800]
+                message = f'{code}: slots must look like ["Monday", "08:00-10:00"]'
+                raise ValueError(message) from None
+            new[code] = (course, slots)
+        added = [code for code in new if code not in self.by_code]
+        removed = [code for code in self.by_code if code not in new]
+        changed = [
+            code for code in new if code in self.by_code and new[code][0] != self.by_code[code]
+        ]
+        moved = [code for code in changed if new[code][1] != self.slots[code]]
+        if not (added or removed or changed):
+            return [], [], [], []
+
+        relink = set()  # positions whose conflict-graph row needs recomputing
+        holes = []
+        for code in removed:
+            i = self.index.pop(code)
+            self.courses[i] = None
+            self.holes += 1
+            del self.by_code[code], self.slots[code], self.masks[code]
+            holes.append(i)
+        relink.update(holes)
+        for code in changed:
+            course, slots = new[code]
+            self.courses[self.index[code]] = course
+            self.by_code[code] = course
+            self.slots[code] = slots
+            self.masks[code] = slots_mask(slots, self.granularity)
+        relink.update(self.index[code] for code in moved)
+        for code in added:
+            course, slots = new[code]
+            relink.add(len(self.courses))
+            self.index[code] = len(self.courses)
+            self.courses.append(course)
+            self.by_code[code] = course
+            self.slots[code] = slots
+            self.masks[code] = slots_mask(slots, self.granularity)
+        self.version += 1
+
+        if self.holes > max(len(self.courses) // 2, 64):
+            self.renumber()  # mostly holes: rebuild the positions (and, lazily, the indexes)
+            return added, removed, changed, moved
+        if self._conflicts is not None:
+            self._conflicts += [0] * (len(self.courses) - len(self._conflicts))
+            for i in sorted(relink):
+                self.relink(i)
+        if self._ngrams is not None:
+            self._keys += [""] * (len(self.courses) - len(self._keys))
+            for i in holes:
+                self._keys[i] = ""  # its old postings stay behind, but "" never confirms
+            for code in changed + added:
+                self.reindex_key(self.index[code])
+        return added, removed, changed, moved
+
+    def relink(self, i):
+        # recompute course i's row of the conflict graph, and its bit in every
+        # other row: old neighbours lose it, new ones gain it
+        conflicts = self._conflicts
+        bit = 1 << i
+        for j in bit_indices(conflicts[i]):
+            conflicts[j] &= ~bit
+        row = 0
+        course = self.courses[i]
+        if course is not None:
+            code = course["code"]
+            mask = self.masks[code]
+            masks, slots = self.masks, self.slots
+            for j, other in enumerate(self.courses):
+                if (
+                    other is not None
+                    and j != i
+                    and masks[other["code"]] & mask
+                    and overlapping_slot(slots[code], slots[other["code"]])
+                ):
+                    row |= 1 << j
+            for j in bit_indices(row):
+                conflicts[j] |= bit
+        conflicts[i] = row
+
+    def reindex_key(self, i):
+        key = search_key(self.courses[i])
+        old = self._keys[i]
+        self._keys[i] = key
+        # postings of n-grams the course lost stay behind (the key check filters them),
+        # so a gram it gets back may still list it
+        for gram in ngrams_of(key) - ngrams_of(old):
+            postings = self._ngrams.setdefault(gram, array("i"))
+            at = bisect.bisect_left(postings, i)
+            if at == len(postings) or postings[at] != i:
+                postings.insert(at, i)
+
+    def renumber(self):
+        self.courses = [course for course in self.courses if course is not None]
+        self.index = {course["code"]: i for i, course in enumerate(self.courses)}
+        self.holes = 0
+        self._conflicts = None
+        self._keys = None
+        self._ngrams = None
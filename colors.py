@@ -0,0 +1,12 @@
+# one colour per course, picked by its catalog position: the GUI timetable and the
+# images written by export.py use the same, so a course looks alike in both
+COURSE_COLORS = [
+    "#A7C7E7",  # Soft Sky Blue
+    "#B5EAD7",  # Mint Green
+    "#E0BBE4",  # Lavender Purple
+    "#FFC3A0",  # Peach Orange
+    "#C7CEEA",  # Periwinkle
+    "#FFDAC1",  # Light Coral
+    "#E2F0CB",  # Pale Lime
+    "#D4A5A5",  # Dusty Rose
+]
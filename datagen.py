@@ -0,0 +1,137 @@
+import argparse
+import json
+import os
+import random
+
+from rules import MATRIC_PREFIX, MAX_CREDITS, MIN_CREDITS
+from slots import DAYS, parse_slots, slots_mask
+
+# seeded synthetic catalogs and cohorts for bench.py: the same (size, seed) always
+# gives byte-identical files, so timings are comparable across commits
+
+PREFIXES = ["SAIA", "SECJ", "SECR", "SECP", "SECV", "SSCM", "ULRS", "UHLB", "UKQF", "SKEL"]
+WORDS = [
+    "INTRODUCTION", "ADVANCED", "APPLIED", "DATA", "MACHINE", "LEARNING", "NETWORK",
+    "SYSTEMS", "THEORY", "PROGRAMMING", "DESIGN", "ANALYSIS", "MATHEMATICS", "VISION",
+    "LANGUAGE", "ROBOTICS", "SECURITY", "DATABASE", "ETHICS", "STATISTICS", "CLOUD",
+    "COMPUTING", "GRAPHICS", "OPTIMIZATION", "SIGNALS", "ENGLISH", "MANAGEMENT",
+]
+FIRST_NAMES = [
+    "Adam", "Aisyah", "Amir", "Chen", "Daniel", "Farah", "Hafiz", "Iman", "Jia", "Kumar",
+    "Lina", "Mei", "Nur", "Omar", "Priya", "Rahman", "Siti", "Tan", "Wei", "Zara",
+]
+LAST_NAMES = [
+    "Abdullah", "Ahmad", "Ali", "Chong", "Hassan", "Ibrahim", "Ismail", "Lee", "Lim",
+    "Ng", "Osman", "Rao", "Razak", "Singh", "Tan", "Wong", "Yusof", "Zainal",
+]
+# (meetings per week, minutes per meeting, weight): lectures, long labs, short tutorials
+SLOT_PATTERNS = [(2, 120, 5), (1, 180, 2), (3, 60, 3), (2, 90, 3), (1, 60, 1)]
+CAPACITIES = [None, None, 30, 40, 60, 120, 250]  # None: no seat limit
+MAX_STUDENTS = 10000  # a matric is MATRIC_PREFIX + 4 digits (see rules.matric_error)
+
+
+def clock(minutes):
+    return f"{minutes // 60:02d}:{minutes % 60:02d}"
+
+
+def generate_courses(count, seed=0):
+    rng = random.Random(seed)
+    patterns = [p[:2] for p in SLOT_PATTERNS]
+    weights = [p[2] for p in SLOT_PATTERNS]
+    courses = []
+    for i in range(count):
+        meetings, minutes = rng.choices(patterns, weights)[0]
+        days = rng.sample(DAYS[:5] if rng.random() < 0.95 else DAYS[:6], meetings)
+        slots = []
+        for day in sorted(days, key=DAYS.index):
+            start = rng.randrange(8 * 60, 18 * 60 - minutes + 1, 30)
+            end = start + minutes
+            slots.append([day, f"{clock(start)}-{clock(end)}"])
+        course = {
+            "code": f"{PREFIXES[i % len(PREFIXES)]}{i // len(PREFIXES):04d}",
+            "name": " ".join(rng.sample(WORDS, rng.randint(2, 4))),
+            "credit": rng.choice([2, 3, 3, 3, 4]),
+            "slots": slots,
+            "location": f"Block {rng.choice('ABCDEFGHN')}, Room {rng.randint(1, 40)}",
+        }
+        capacity = rng.choice(CAPACITIES)
+        if capacity is not None:
+            course["capacity"] = capacity
+        courses.append(course)
+    return courses
+
+
+def matric_of(n):
+    return f"{MATRIC_PREFIX}{n:04d}"
+
+
+def generate_students(count, courses, seed=0):
+    # each student gets a random clash-free load inside the credit limits; seat
+    # capacities are ignored, the cohort is a starting state, not a registration run
+    if count > MAX_STUDENTS:
+        raise ValueError(
+            f"{count} students: only {MAX_STUDENTS} valid matric numbers exist "
+            f"({MATRIC_PREFIX}0000-{MATRIC_PREFIX}{MAX_STUDENTS - 1:04d})"
+        )
+    rng = random.Random(seed + 1)
+    masks = [slots_mask(parse_slots(c)) for c in courses]
+    students = []
+    for n in range(count):
+        target = rng.randint(MIN_CREDITS, MAX_CREDITS)
+        taken, codes, credits = 0, [], 0
+        for _ in range(40):  # attempts, so a crowded timetable can't loop forever
+            if credits >= target:
+                break
+            i = rng.randrange(len(courses))
+            course = courses[i]
+            if masks[i] & taken or credits + course["credit"] > MAX_CREDITS:
+                continue
+            taken |= masks[i]
+            codes.append(course["code"])
+            credits += course["credit"]
+        students.append(
+            {
+                "name": f"{rng.choice(FIRST_NAMES)} {rng.choice(LAST_NAMES)}",
+                "matric": matric_of(n),
+                "registered_courses": codes,
+                "total_credits": credits,
+            }
+        )
+    return students
+
+
+def dataset_dir(course_count, student_count, seed=0):
+    return os.path.join(".cache", "bench", f"{course_count}c-{student_count}s-seed{seed}")
+
+
+def write_dataset(directory, course_count, student_count, seed=0):
+    # -> (courses path, students path); files already there are reused, so a real
+    # students.json is never overwritten
+    os.makedirs(directory, exist_ok=True)
+    courses_path = os.path.join(directory, "courses.json")
+    students_path = os.path.join(directory, "students.json")
+    if os.path.exists(courses_path) and os.path.exists(students_path):
+        return courses_path, students_path
+    courses = generate_courses(course_count, seed)
+    students = generate_students(student_count, courses, seed)
+    for path, data in ((courses_path, courses), (students_path, students)):
+        with open(path + ".tmp", "w") as f:
+            json.dump(data, f, indent=4)
+        os.replace(path + ".tmp", path)
+    return courses_path, students_path
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        prog="datagen", description="Write a synthetic courses.json / students.json pair."
+    )
+    parser.add_argument("--courses", type=int, default=1000)
+    parser.add_argument("--students", type=int, default=10000)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--out", help="directory to write into (default: under .cache/bench)")
+    args = parser.parse_args()
+    if args.students > MAX_STUDENTS:
+        parser.error(f"--students can be at most {MAX_STUDENTS}, one per valid matric number")
+    out = args.out or dataset_dir(args.courses, args.students, args.seed)
+    paths = write_dataset(out, args.courses, args.students, args.seed)
+    print(f"Wrote {paths[0]} and {paths[1]}")
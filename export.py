@@ -0,0 +1,354 @@
+import argparse
+import datetime
+import itertools
+import os
+import sys
+import time
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+
+from catalog import Catalog
+from colors import COURSE_COLORS
+from slots import DAYS
+from storage import open_store
+
+# python export.py OUT_DIR                          -> every student, png + pdf + ics
+# python export.py OUT_DIR --format ics --course SECJ1013 --student A25AI1234 ...
+
+FORMATS = ("png", "pdf", "ics")
+CHUNK = 200  # students per task sent to a worker process
+IN_FLIGHT = 4  # tasks queued per worker; students are read from the store as these drain
+IN_PROCESS_BELOW = 500  # smaller exports run without starting a pool
+SEMESTER_WEEKS = 14
+
+# image layout, in pixels: a row per day, a column per hour (like the GUI's timetable tab)
+EXPORT_DAYS = DAYS[:5]
+EXPORT_HOURS = range(8, 18)
+TITLE_HEIGHT = 50
+HEADER_HEIGHT = 30
+LABEL_WIDTH = 110
+CELL_WIDTH = 110
+CELL_HEIGHT = 80
+PDF_RESOLUTION = 100  # dpi; the image is a landscape page of about 12 x 5 inches
+
+
+# ==========================================
+# RENDERING (worker processes)
+# ==========================================
+# each worker builds the catalog, the fonts and the empty grid once; a timetable
+# is then a copy of the grid plus one rectangle and label per meeting
+catalog = None
+grid = None  # (PIL image of the empty grid, title font, block font), built on first use
+semester = None  # (first Monday, weeks)
+
+
+def init_worker(courses, first_monday, weeks):
+    global catalog, semester
+    catalog = Catalog(courses)
+    semester = (first_monday, weeks)
+
+
+def base_grid():
+    # imported here: an .ics-only export doesn't need PIL
+    global grid
+    if grid is None:
+        from PIL import Image, ImageDraw, ImageFont
+
+        width = LABEL_WIDTH + CELL_WIDTH * len(EXPORT_HOURS)
+        height = TITLE_HEIGHT + HEADER_HEIGHT + CELL_HEIGHT * len(EXPORT_DAYS)
+        image = Image.new("RGB", (width, height), "#ffffff")
+        draw = ImageDraw.Draw(image)
+        header_font = ImageFont.load_default(size=14)
+        for i, hour in enumerate(EXPORT_HOURS):
+            x = LABEL_WIDTH + i * CELL_WIDTH
+            draw.text(
+                (x + CELL_WIDTH / 2, TITLE_HEIGHT + HEADER_HEIGHT / 2),
+                f"{hour:02d}:00",
+                fill="#333333",
+                font=header_font,
+                anchor="mm",
+            )
+        for r, day in enumerate(EXPORT_DAYS):
+            y = TITLE_HEIGHT + HEADER_HEIGHT + r * CELL_HEIGHT
+            draw.text(
+                (10, y + CELL_HEIGHT / 2), day, fill="#333333", font=header_font, anchor="lm"
+            )
+            for i in range(len(EXPORT_HOURS)):
+                x = LABEL_WIDTH + i * CELL_WIDTH
+                draw.rectangle(
+                    (x + 1, y + 1, x + CELL_WIDTH - 2, y + CELL_HEIGHT - 2), fill="#f0f0f0"
+                )
+        grid = (image, ImageFont.load_default(size=20), ImageFont.load_default(size=12))
+    return grid
+
+
+def render_image(student):
+    from PIL import ImageDraw
+
+    empty, title_font, block_font = base_grid()
+    image = empty.copy()
+    draw = ImageDraw.Draw(image)
+    draw.text(
+        (10, TITLE_HEIGHT / 2),
+        f"{student['name']} ({student['matric']}) - {student['total_credits']} credits",
+        fill="#2E8B57",
+        font=title_font,
+        anchor="lm",
+    )
+    first = EXPORT_HOURS[0] * 60
+    last = (EXPORT_HOURS[-1] + 1) * 60
+    for code in student["registered_courses"]:
+        course = catalog.get(code)
+        if course is None:
+            continue
+        color = COURSE_COLORS[catalog.index[code] % len(COURSE_COLORS)]
+        for day_index, start, end in catalog.slots[code]:
+            start, end = max(start, first), min(end, last)
+            if start >= end or day_index >= len(EXPORT_DAYS):
+                continue
+            x0 = LABEL_WIDTH + (start - first) / 60 * CELL_WIDTH
+            x1 = LABEL_WIDTH + (end - first) / 60 * CELL_WIDTH
+            y0 = TITLE_HEIGHT + HEADER_HEIGHT + day_index * CELL_HEIGHT
+            draw.rectangle((x0 + 4, y0 + 8, x1 - 4, y0 + CELL_HEIGHT - 8), fill=color)
+            draw.multiline_text(
+                ((x0 + x1) / 2, y0 + CELL_HEIGHT / 2),
+                f"{code}\n{course['location']}",
+                fill="#333333",
+                font=block_font,
+                anchor="mm",
+                align="center",
+            )
+    return image
+
+
+# ICALENDAR (RFC 5545): one weekly event per meeting slot, for the whole semester.
+# times are floating (no time zone), i.e. local wall-clock time wherever it's opened
+def ics_text(value):
+    text = str(value).replace("\\", "\\\\").replace(";", "\\;").replace(",", "\\,")
+    return text.replace("\n", "\\n")
+
+
+def ics_fold(line):
+    # content lines longer than 75 octets continue on the next line after a space
+    data = line.encode("utf-8")
+    if len(data) <= 75:
+        return line
+    parts = []
+    while len(data) > 75:
+        cut = 75 if not parts else 74
+        while cut and (data[cut] & 0xC0) == 0x80:  # don't split a UTF-8 sequence
+            cut -= 1
+        parts.append(data[:cut].decode("utf-8"))
+        data = data[cut:]
+    parts.append(data.decode("utf-8"))
+    return "\r\n ".join(parts)
+
+
+def render_ics(student, stamp):
+    first_monday, weeks = semester
+    lines = [
+        "BEGIN:VCALENDAR",
+        "VERSION:2.0",
+        "PRODID:-//UTM AI//Timetable Builder//EN",
+        "CALSCALE:GREGORIAN",
+        f"X-WR-CALNAME:{ics_text(student['name'] + ' timetable')}",
+    ]
+    for code in student["registered_courses"]:
+        course = catalog.get(code)
+        if course is None:
+            continue
+        for day_index, start, end in catalog.slots[code]:
+            day = first_monday + datetime.timedelta(days=day_index)
+            lines += [
+                "BEGIN:VEVENT",
+                f"UID:{student['matric']}-{code}-{day_index}-{start}@timetable",
+                f"DTSTAMP:{stamp}",
+                f"DTSTART:{day:%Y%m%d}T{start // 60:02d}{start % 60:02d}00",
+                f"DTEND:{day:%Y%m%d}T{end // 60:02d}{end % 60:02d}00",
+                f"RRULE:FREQ=WEEKLY;COUNT={weeks}",
+                f"SUMMARY:{ics_text(code + ' ' + course['name'])}",
+                f"LOCATION:{ics_text(course.get('location', ''))}",
+                "END:VEVENT",
+            ]
+    lines.append("END:VCALENDAR")
+    return "\r\n".join(ics_fold(line) for line in lines) + "\r\n"
+
+
+def export_chunk(students, out_dir, formats):
+    # -> (files written, [(matric, error)])
+    stamp = time.strftime("%Y%m%dT%H%M%SZ", time.gmtime())
+    written, errors = 0, []
+    for student in students:
+        path = os.path.join(out_dir, student["matric"])
+        try:
+            if "png" in formats or "pdf" in formats:
+                image = render_image(student)
+                if "png" in formats:
+                    image.save(path + ".png", optimize=False)
+                    written += 1
+                if "pdf" in formats:
+                    image.save(path + ".pdf", "PDF", resolution=PDF_RESOLUTION)
+                    written += 1
+            if "ics" in formats:
+                with open(path + ".ics", "w", newline="") as f:
+                    f.write(render_ics(student, stamp))
+                written += 1
+        except (OSError, ValueError) as e:
+            errors.append((student["matric"], str(e)))
+    return written, errors
+
+
+# ==========================================
+# DRIVER (main process)
+# ==========================================
+def chunks_of(students, size=CHUNK):
+    chunk = []
+    for student in students:
+        chunk.append(student)
+        if len(chunk) == size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+def selected(store, matrics=None, codes=None, missing=None):
+    # students to export, streamed from the store; both filters may be given. named
+    # students are looked up one by one (missing: collects the ones not found), the
+    # rest are a scan
+    courses = set(codes) if codes else None
+    if matrics:
+        found = ((matric, store.get_student(matric)) for matric in dict.fromkeys(matrics))
+    else:
+        found = ((student["matric"], student) for student in store.iter_students())
+    for matric, student in found:
+        if student is None:
+            if missing is not None:
+                missing.append(matric)
+            continue
+        if courses is not None and courses.isdisjoint(student["registered_courses"]):
+            continue
+        yield student
+
+
+def export_all(
+    students, courses, out_dir, formats, first_monday, weeks=SEMESTER_WEEKS, jobs=None,
+    progress=None,
+):
+    # students may be any iterable (a generator over the store): it is read only as
+    # fast as the workers drain it, at most workers * IN_FLIGHT chunks ahead.
+    # -> (students exported, files written, [(matric, error)])
+    os.makedirs(out_dir, exist_ok=True)
+    done = written = 0
+    errors = []
+
+    def collect(result, count):
+        nonlocal done, written
+        written += result[0]
+        errors.extend(result[1])
+        done += count
+        if progress:
+            progress(done, written)
+
+    chunks = chunks_of(students)
+    head, size = [], 0
+    for chunk in chunks:  # enough to tell whether a pool is worth starting
+        head.append(chunk)
+        size += len(chunk)
+        if size >= IN_PROCESS_BELOW:
+            break
+    chunks = itertools.chain(head, chunks)
+
+    if size < IN_PROCESS_BELOW or jobs == 1:
+        init_worker(courses, first_monday, weeks)
+        for chunk in chunks:
+            collect(export_chunk(chunk, out_dir, formats), len(chunk))
+        return done, written, errors
+
+    workers = jobs or os.cpu_count() or 1
+    with ProcessPoolExecutor(
+        workers, initializer=init_worker, initargs=(courses, first_monday, weeks)
+    ) as pool:
+        pending = {}  # future -> students in its chunk
+        for chunk in chunks:
+            pending[pool.submit(export_chunk, chunk, out_dir, formats)] = len(chunk)
+            while len(pending) >= workers * IN_FLIGHT:
+                finished, _ = wait(pending, return_when=FIRST_COMPLETED)
+                for future in finished:
+                    collect(future.result(), pending.pop(future))
+        for future in list(pending):
+            collect(future.result(), pending.pop(future))
+    return done, written, errors
+
+
+def next_monday(today=None):
+    today = today or datetime.date.today()
+    return today + datetime.timedelta(days=(7 - today.weekday()) % 7)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        prog="export",
+        description="Write timetables for many students as PNG, PDF and .ics files.",
+    )
+    parser.add_argument("out_dir", help="directory for <matric>.png / .pdf / .ics")
+    parser.add_argument(
+        "--format", default=",".join(FORMATS), help="comma-separated: png, pdf, ics (default: all)"
+    )
+    parser.add_argument("--student", action="append", help="only this matric (repeatable)")
+    parser.add_argument(
+        "--course", action="append", help="only students taking this course (repeatable)"
+    )
+    parser.add_argument(
+        "--start", help="first Monday of the semester, YYYY-MM-DD (default: next Monday)"
+    )
+    parser.add_argument(
+        "--weeks", type=int, default=SEMESTER_WEEKS, help="teaching weeks, for the .ics events"
+    )
+    parser.add_argument("--jobs", type=int, help="worker processes (default: one per CPU)")
+    args = parser.parse_args(argv)
+
+    formats = {f.strip().lower() for f in args.format.split(",") if f.strip()}
+    if not formats or formats - set(FORMATS):
+        parser.error(f"--format takes a comma-separated list of {', '.join(FORMATS)}")
+    first_monday = next_monday()
+    if args.start:
+        first_monday = datetime.date.fromisoformat(args.start)
+        if first_monday.weekday() != 0:
+            parser.error("--start must be a Monday")
+
+    started = time.perf_counter()
+    store = open_store()
+    courses = store.courses()
+    matrics = [m.strip().upper() for m in args.student or []]
+    codes = [c.strip().upper() for c in args.course or []]
+
+    missing = []
+
+    def progress(done, written):
+        print(f"\r{done} students, {written} files", end="", flush=True)
+
+    done, written, errors = export_all(
+        selected(store, matrics, codes, missing),
+        courses,
+        args.out_dir,
+        formats,
+        first_monday,
+        args.weeks,
+        args.jobs,
+        progress,
+    )
+    print()
+    for matric in missing:
+        print(f"{matric}: student not found")
+    for matric, error in errors:
+        print(f"{matric}: {error}")
+    print(
+        f"Exported {done} students ({written} files) to {args.out_dir} "
+        f"in {time.perf_counter() - started:.2f}s"
+        + (f", {len(errors)} failed" if errors else "")
+    )
+    return 1 if errors else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
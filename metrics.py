@@ -0,0 +1,161 @@
+import atexit
+import bisect
+import functools
+import json
+import os
+import threading
+import time
+
+# turned on with TIMETABLE_METRICS=1. when off, timed() hands back the function it
+# was given, so instrumented code runs exactly as if it were not instrumented
+METRICS_ENABLED = bool(os.environ.get("TIMETABLE_METRICS"))
+# *.json -> JSON dump, anything else -> Prometheus text exposition format
+METRICS_FILE = os.environ.get("TIMETABLE_METRICS_FILE", "metrics.prom")
+METRICS_INTERVAL = float(os.environ.get("TIMETABLE_METRICS_INTERVAL", "60"))  # 0: at exit only
+PREFIX = "timetable_"
+# upper bounds in seconds, 50us .. 10s
+BUCKETS = (
+    0.00005, 0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01,
+    0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0,
+)
+
+
+# ==========================================
+# HISTOGRAMS
+# ==========================================
+class Histogram:
+    def __init__(self, buckets=BUCKETS):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)  # the last one is +Inf
+        self.count = 0
+        self.sum = 0.0
+
+    def observe(self, seconds):
+        self.counts[bisect.bisect_left(self.buckets, seconds)] += 1
+        self.count += 1
+        self.sum += seconds
+
+    def quantile(self, q):
+        # upper bound of the bucket holding the q-th observation (what Prometheus'
+        # histogram_quantile would interpolate inside)
+        if not self.count:
+            return None
+        rank = q * self.count
+        seen = 0
+        for bound, count in zip(self.buckets + (float("inf"),), self.counts):
+            seen += count
+            if seen >= rank:
+                return bound
+        return float("inf")
+
+
+class Metrics:
+    def __init__(self, enabled=METRICS_ENABLED):
+        self.enabled = enabled
+        self.lock = threading.Lock()
+        self.histograms = {}  # (name, ((label, value), ...)) -> Histogram
+        self.exporter = None
+
+    def observe(self, name, seconds, **labels):
+        if not self.enabled:
+            return
+        key = (name, tuple(sorted(labels.items())))
+        with self.lock:
+            histogram = self.histograms.get(key)
+            if histogram is None:
+                histogram = self.histograms[key] = Histogram()
+            histogram.observe(seconds)
+
+    def timed(self, name, **labels):
+        # decorator; "name" becomes timetable_<name>_seconds
+        def decorate(func):
+            if not self.enabled:
+                return func
+
+            @functools.wraps(func)
+            def wrapper(*args, **kwargs):
+                started = time.perf_counter()
+                try:
+                    return func(*args, **kwargs)
+                finally:
+                    self.observe(name, time.perf_counter() - started, **labels)
+
+            return wrapper
+
+        return decorate
+
+    # EXPORT
+    def snapshot(self):
+        with self.lock:
+            return [
+                (name, labels, list(h.counts), h.count, h.sum, h)
+                for (name, labels), h in sorted(self.histograms.items())
+            ]
+
+    def prometheus(self):
+        lines = []
+        typed = set()
+        for name, labels, counts, count, total, _ in self.snapshot():
+            metric = f"{PREFIX}{name}_seconds"
+            if metric not in typed:
+                lines.append(f"# TYPE {metric} histogram")
+                typed.add(metric)
+            label_text = "".join(f'{k}="{v}",' for k, v in labels)
+            cumulative = 0
+            for bound, n in zip(BUCKETS + ("+Inf",), counts):
+                cumulative += n
+                lines.append(f'{metric}_bucket{{{label_text}le="{bound}"}} {cumulative}')
+            suffix = f"{{{label_text.rstrip(',')}}}" if labels else ""
+            lines.append(f"{metric}_sum{suffix} {total}")
+            lines.append(f"{metric}_count{suffix} {count}")
+        return "\n".join(lines) + "\n"
+
+    def as_json(self):
+        result = {}
+        for name, labels, counts, count, total, histogram in self.snapshot():
+            key = f"{PREFIX}{name}_seconds"
+            if labels:
+                key += "{" + ",".join(f"{k}={v}" for k, v in labels) + "}"
+            result[key] = {
+                "count": count,
+                "sum_s": total,
+                "mean_s": total / count if count else None,
+                "p50_le_s": histogram.quantile(0.5),
+                "p95_le_s": histogram.quantile(0.95),
+                "p99_le_s": histogram.quantile(0.99),
+                "buckets": dict(zip([str(b) for b in BUCKETS] + ["+Inf"], counts)),
+            }
+        return result
+
+    def export(self, path=METRICS_FILE):
+        if not self.enabled:
+            return
+        if path.endswith(".json"):
+            text = json.dumps({"time": time.time(), "metrics": self.as_json()}, indent=4)
+        else:
+            text = self.prometheus()
+        tmp_path = path + ".tmp"
+        with open(tmp_path, "w") as f:
+            f.write(text)
+        os.replace(tmp_path, path)  # scrapers never see a half-written file
+
+    def start(self, path=METRICS_FILE, interval=METRICS_INTERVAL):
+        # periodic export on a daemon thread, plus a final one at exit
+        if not self.enabled or self.exporter is not None:
+            return
+        atexit.register(self.export, path)
+        if interval <= 0:
+            self.exporter = False
+            return
+
+        def loop():
+            while True:
+                time.sleep(interval)
+                self.export(path)
+
+        self.exporter = threading.Thread(target=loop, name="metrics-export", daemon=True)
+        self.exporter.start()
+
+
+METRICS = Metrics()
+timed = METRICS.timed
@@ -0,0 +1,41 @@
+import os
+import sys
+import time
+
+# turned on with --profile-startup on the command line or TIMETABLE_PROFILE_STARTUP=1
+PROFILE_STARTUP = "--profile-startup" in sys.argv or bool(
+    os.environ.get("TIMETABLE_PROFILE_STARTUP")
+)
+
+
+# ==========================================
+# STARTUP TIMING
+# ==========================================
+# mark() records how long each launch phase took since the previous mark; the
+# clock starts when this module is first imported, so import it first
+class StartupProfiler:
+    def __init__(self, enabled=PROFILE_STARTUP):
+        self.enabled = enabled
+        self.started = time.perf_counter()
+        self.last = self.started
+        self.phases = []
+
+    def mark(self, label):
+        if not self.enabled:
+            return
+        now = time.perf_counter()
+        self.phases.append((label, now - self.last))
+        self.last = now
+
+    def report(self, title="Startup timing"):
+        if not self.enabled:
+            return
+        width = max((len(label) for label, _ in self.phases), default=0)
+        print(f"\n{title}:", file=sys.stderr)
+        for label, seconds in self.phases:
+            print(f"  {label:<{width}}  {seconds * 1000:8.1f} ms", file=sys.stderr)
+        total = self.last - self.started
+        print(f"  {'total':<{width}}  {total * 1000:8.1f} ms", file=sys.stderr)
+
+
+STARTUP = StartupProfiler()
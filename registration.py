@@ -0,0 +1,500 @@
+import threading
+from collections import deque
+
+from metrics import timed
+from rules import MAX_CREDITS, MIN_CREDITS, add_error, matric_error, name_error
+from slots import DAYS, format_slot
+
+
+ENROLLED = "enrolled"
+WAITLISTED = "waitlisted"
+
+
+class RegistrationError(Exception):
+    pass
+
+
+# ==========================================
+# SEATS (one per course)
+# ==========================================
+# a course's seat count and FIFO waitlist, guarded by the course's own lock, so
+# enrolling in different courses never contends. lock order is always
+# student lock -> seat lock -> store lock
+class Seats:
+    def __init__(self, capacity=None, taken=0, waiting=()):
+        self.lock = threading.Lock()
+        self.capacity = capacity  # None: unlimited (courses.json has no "capacity")
+        self.taken = taken  # enrolled students plus a seat being handed to the waitlist
+        self.waiting = deque(waiting)  # matrics, first in line on the left
+        self.promoting = set()  # off the queue, seat reserved, enrollment not yet written
+
+    def free(self):
+        return self.capacity is None or self.taken < self.capacity
+
+
+# ==========================================
+# REGISTRY (one per process)
+# ==========================================
+# owns the store and the catalog and hands out Sessions. locking is two-level:
+# each student has its own lock, held while a change is checked and applied, and
+# a short store lock serializes the actual write, so different students never
+# wait on each other's checks
+class Registry:
+    def __init__(self, store, catalog):
+        self.store = store
+        self.catalog = catalog
+        self.lock = threading.Lock()  # guards students / student_locks / registration
+        self.store_lock = threading.Lock()
+        self.students = {}  # matric -> student dict shared by every session of that student
+        self.student_locks = {}
+        self.seats = None  # code -> Seats, counted from the store on first use
+        self.versions = {}  # matric -> writes so far, lets views cache per registration state
+        self.notices = {}  # matric -> messages about catalog changes, shown at next chance
+
+    def lock_for(self, matric):
+        with self.lock:
+            return self.student_locks.setdefault(matric, threading.Lock())
+
+    def write(self, method, student, *args):
+        with self.store_lock:
+            result = method(student, *args)
+            self.versions[student["matric"]] = self.versions.get(student["matric"], 0) + 1
+        return result
+
+    def version_of(self, matric):
+        return self.versions.get(matric, 0)
+
+    def find_student(self, matric):
+        with self.lock:
+            student = self.students.get(matric)
+        if student is not None:
+            return student
+        # read outside self.lock, so other sessions' lock_for never waits on the disk
+        with self.store_lock:
+            student = self.store.get_student(matric)
+        if student is None:
+            return None
+        with self.lock:
+            # two first logins may both have read it: everyone shares the first copy
+            return self.students.setdefault(matric, student)
+
+    @timed("registry_login")
+    def login(self, matric):
+        matric = matric.strip().upper()
+        error = matric_error(matric)
+        if error:
+            raise RegistrationError(error)
+        student = self.find_student(matric)
+        if student is None:
+            raise RegistrationError("Student not found. Please register first.")
+        return Session(self, student)
+
+    @timed("registry_register")
+    def register(self, name, matric):
+        name = name.strip()
+        matric = matric.strip().upper()
+        error = name_error(name) or matric_error(matric)
+        if error:
+            raise RegistrationError(error)
+        student = {
+            "name": name.title(),
+            "matric": matric,
+            "registered_courses": [],
+            "total_credits": 0,
+        }
+        with self.lock:
+            with self.store_lock:
+                if matric in self.students or self.store.get_student(matric):
+                    raise RegistrationError("This matric number is already registered.")
+                self.store.register(student)
+            self.students[matric] = student
+        return Session(self, student)
+
+    # SEATS
+    def seats_of(self, code):
+        if self.seats is None:
+            self.load_seats()
+        return self.seats.get(code) or Seats()  # unknown code: nothing to limit
+
+    def load_seats(self):
+        with self.lock:
+            if self.seats is not None:
+                return
+            with self.store_lock:
+                counts = self.store.enrollment_counts()
+                waitlists = self.store.waitlists()
+                for code, queue in waitlists.items():
+                    for matric in list(queue):
+                        student = self.store.get_student(matric)
+                        if student is None or code in student["registered_courses"]:
+                            queue.remove(matric)
+                            self.store.leave_waitlist({"matric": matric}, {"code": code})
+            seats = {}
+            for course in self.catalog:
+                code = course["code"]
+                seats[code] = Seats(
+                    course.get("capacity"), counts.get(code, 0), waitlists.get(code, ())
+                )
+            self.seats = seats
+        for code in list(self.seats):
+            self.fill_seats(code)
+
+    def fill_seats(self, code):
+        # seats left open by a crash between a drop and its promotion, or a raised capacity
+        seats = self.seats[code]
+        while True:
+            with seats.lock:
+                if not (seats.waiting and seats.free()):
+                    break
+                seats.taken += 1
+                matric = seats.waiting.popleft()
+                seats.promoting.add(matric)
+            self.promote(self.catalog.by_code[code], matric)
+
+    def pass_seat(self, seats):
+        # call with seats.lock held when a seat opens up: it goes to the head of the
+        # waitlist (still counted as taken, so nobody can jump the queue) or is freed
+        if seats.waiting:
+            matric = seats.waiting.popleft()
+            seats.promoting.add(matric)
+            return matric
+        seats.taken -= 1
+        return None
+
+    def promote(self, course, matric):
+        # hand the reserved seat to `matric`; anyone who can no longer take the
+        # course (a clash or the credit limit since they joined) is skipped
+        seats = self.seats_of(course["code"])
+        while matric is not None:
+            student = self.find_student(matric)
+            with self.lock_for(matric):
+                fits = student is not None and (
+                    course["code"] not in student["registered_courses"]
+                    and Session(self, student).add_error(course) is None
+                )
+                with seats.lock:
+                    seats.promoting.discard(matric)
+                    # enrolled before leaving the list: a crash in between can
+                    # only leave a stale waitlist entry, which load_seats drops
+                    if fits:
+                        self.write(self.store.add_course, student, course)
+                    self.write(self.store.leave_waitlist, student or {"matric": matric}, course)
+                    if fits:
+                        return matric
+                    matric = self.pass_seat(seats)
+        return None
+
+    # CATALOG RELOAD
+    @timed("registry_reload_catalog")
+    def reload_catalog(self, courses):
+        # apply an edited courses.json (see storage.CourseWatcher) without a restart.
+        # -> ((added, removed, changed) codes, {matric: [messages]}); the messages go to
+        # students registered in a course that moved, changed its credits or was
+        # withdrawn, and to anyone waiting on a withdrawn one. they are also kept in
+        # self.notices until the student's next session picks them up
+        catalog = self.catalog
+        credits = {code: course["credit"] for code, course in catalog.by_code.items()}
+        added, removed, changed, moved = catalog.apply_changes(courses)
+        if not (added or removed or changed):
+            return ([], [], []), {}
+        recredited = [code for code in changed if catalog.by_code[code]["credit"] != credits[code]]
+        touched = list(dict.fromkeys(moved + recredited))
+        with self.store_lock:
+            self.store.update_courses([catalog.by_code[c] for c in added + changed], removed)
+            rosters = self.store.registered_in(removed + touched + added)
+            waitlists = self.store.waitlists() if removed else {}
+
+        # stored registrations follow the catalog: withdrawn courses are dropped and
+        # totals recounted with the new credits, each student under their own lock
+        for matric in dict.fromkeys(m for code in removed + recredited for m in rosters[code]):
+            with self.lock_for(matric):
+                student = self.find_student(matric)
+                if student is None:
+                    continue
+                for code in removed:
+                    if code in student["registered_courses"]:
+                        course = {"code": code, "credit": credits[code]}
+                        self.write(self.store.drop_course, student, course)
+                total = sum(
+                    catalog.by_code[code]["credit"]
+                    for code in student["registered_courses"]
+                    if code in catalog.by_code
+                )
+                if total != student["total_credits"]:
+                    self.write(self.store.set_credits, student, total)
+
+        messages = {}
+        for code in removed:
+            for matric in rosters[code]:
+                messages.setdefault(matric, []).append(
+                    f"{code} was withdrawn from the catalog and dropped from your registration. "
+                    "Please choose a replacement."
+                )
+            for matric in waitlists.get(code, ()):
+                self.write(self.store.leave_waitlist, {"matric": matric}, {"code": code})
+                messages.setdefault(matric, []).append(
+                    f"{code} was withdrawn from the catalog; its waitlist is closed."
+                )
+        for code in touched:
+            course = catalog.by_code[code]
+            for matric in rosters[code]:
+                lines = messages.setdefault(matric, [])
+                if code in recredited:
+                    lines.append(f"{code} is now {course['credit']} credits (was {credits[code]}).")
+                    total = self.find_student(matric)["total_credits"]
+                    lines.append(f"Your total is now {total} credits.")
+                if code in moved:
+                    when = ", ".join(format_slot(slot) for slot in catalog.slots[code])
+                    lines.append(f"{code} now meets {when or 'at no scheduled time'}.")
+                    codes = self.find_student(matric)["registered_courses"]
+                    clash = catalog.find_clash(course, [c for c in codes if c != code])
+                    if clash:
+                        other, slot = clash
+                        lines.append(
+                            f"{code} now clashes with {other['code']} on {format_slot(slot)}."
+                        )
+
+        if self.seats is not None:
+            for code in added:
+                self.seats[code] = Seats(catalog.by_code[code].get("capacity"), len(rosters[code]))
+            for code in removed:
+                seats = self.seats.get(code)
+                if seats is not None:
+                    with seats.lock:
+                        seats.waiting.clear()
+            for code in changed:
+                seats = self.seats.get(code)
+                if seats is not None:
+                    with seats.lock:
+                        seats.capacity = catalog.by_code[code].get("capacity")
+                    self.fill_seats(code)  # a raised capacity lets the waitlist in
+
+        with self.lock:
+            for matric, lines in messages.items():
+                self.notices.setdefault(matric, []).extend(lines)
+        return (added, removed, changed), messages
+
+    def flush(self):
+        # writes whatever a batched store (autoflush off) is holding; safe from any thread
+        self.store.flush()
+
+    @timed("registry_close")
+    def close(self):
+        with self.store_lock:
+            self.store.close()
+
+
+# ==========================================
+# SESSION (one per logged-in student)
+# ==========================================
+# everything returns a value or raises RegistrationError; nothing prints
+class Session:
+    def __init__(self, registry, student):
+        self.registry = registry
+        self.student = student
+
+    @property
+    def matric(self):
+        return self.student["matric"]
+
+    @property
+    def catalog(self):
+        return self.registry.catalog
+
+    def courses(self):
+        return self.catalog.resolve(self.student["registered_courses"])
+
+    def clash(self, course):
+        # message for the first registered course that clashes with `course`, else None
+        clash = self.catalog.find_clash(course, self.student["registered_courses"])
+        if clash:
+            reg_course, slot = clash
+            return f"Conflicts with {reg_course['code']} ({reg_course['name']}) on {format_slot(slot)}"
+        return None
+
+    def take_notices(self):
+        # catalog-change messages for this student, each handed out once
+        with self.registry.lock:
+            return self.registry.notices.pop(self.matric, [])
+
+    def add_error(self, course):
+        # why `course` can't be added next to the current registrations, else None
+        return add_error(self.student, course, self.catalog)
+
+    @timed("session_add")
+    def add(self, course):
+        # ENROLLED, or WAITLISTED when the course is full (or already has a queue)
+        registry = self.registry
+        seats = registry.seats_of(course["code"])
+        with registry.lock_for(self.matric):
+            student = self.student
+            if course["code"] in student["registered_courses"]:
+                raise RegistrationError("Already registered for this course!")
+            error = self.add_error(course)
+            if error:
+                raise RegistrationError(error)
+            with seats.lock:
+                if self.matric in seats.waiting or self.matric in seats.promoting:
+                    raise RegistrationError("Already on the waitlist for this course!")
+                if seats.waiting or not seats.free():
+                    seats.waiting.append(self.matric)
+                    registry.write(registry.store.join_waitlist, student, course)
+                    return WAITLISTED
+                seats.taken += 1
+                registry.write(registry.store.add_course, student, course)
+        return ENROLLED
+
+    @timed("session_drop")
+    def drop(self, course):
+        # also takes the student off the course's waitlist
+        registry = self.registry
+        seats = registry.seats_of(course["code"])
+        with registry.lock_for(self.matric):
+            student = self.student
+            if course["code"] not in student["registered_courses"]:
+                with seats.lock:
+                    if self.matric in seats.waiting:
+                        seats.waiting.remove(self.matric)
+                        registry.write(registry.store.leave_waitlist, student, course)
+                        return course
+                raise RegistrationError("You are not registered for this course!")
+            if student["total_credits"] - course["credit"] < MIN_CREDITS:
+                raise RegistrationError(
+                    f"Cannot drop! Would fall below minimum {MIN_CREDITS} credits."
+                )
+            with seats.lock:
+                registry.write(registry.store.drop_course, student, course)
+                promoted = registry.pass_seat(seats)
+        if promoted is not None:
+            registry.promote(course, promoted)  # outside our lock: it takes theirs
+        return course
+
+    def waitlist(self):
+        # [(course, place in line starting at 1)] for every course this student waits on
+        registry = self.registry
+        if registry.seats is None:
+            # no seat counted yet (a one-shot view): read the stored queues rather than
+            # counting every course's enrollment just to look
+            queues = registry.store.waitlists()
+            return [
+                (course, queues[course["code"]].index(self.matric) + 1)
+                for course in self.catalog
+                if self.matric in queues.get(course["code"], ())
+                and course["code"] not in self.student["registered_courses"]
+            ]
+        result = []
+        for course in self.catalog:
+            seats = registry.seats_of(course["code"])
+            with seats.lock:
+                if self.matric in seats.waiting:
+                    result.append((course, seats.waiting.index(self.matric) + 1))
+        return result
+
+    @timed("session_apply_timetable")
+    def apply_timetable(self, codes):
+        # move onto exactly `codes` (a solver result): drop what is not in it, add the
+        # rest. full courses in it are waitlisted. the courses left enrolled must stay
+        # within the credit limits and clash-free, else nothing changes
+        registry = self.registry
+        store = registry.store
+        catalog = self.catalog
+        by_code = catalog.by_code
+        codes = list(dict.fromkeys(codes))
+        unknown = [code for code in codes if code not in by_code]
+        if unknown:
+            raise RegistrationError(f"Course not found: {', '.join(unknown)}")
+        # counted before taking our lock: loading the seats promotes waitlisted
+        # students, which takes their locks (and maybe ours)
+        registry.load_seats()
+        promotions = []
+        with registry.lock_for(self.matric):
+            student = self.student
+            wanted = set(codes)
+            dropping = [
+                code for code in student["registered_courses"]
+                if code not in wanted and code in by_code
+            ]
+            kept = [code for code in student["registered_courses"] if code in wanted]
+
+            # reserve a seat in every open course first, so the check below sees the
+            # set that will really be enrolled
+            enrolling, waiting = [], []
+            for code in codes:
+                if code in student["registered_courses"]:
+                    continue
+                seats = registry.seats_of(code)
+                with seats.lock:
+                    if self.matric in seats.waiting or self.matric in seats.promoting:
+                        continue
+                    if seats.waiting or not seats.free():
+                        waiting.append(code)
+                    else:
+                        seats.taken += 1
+                        enrolling.append(code)
+
+            error = self.timetable_error(kept + enrolling, dropping)
+            if error:
+                for code in enrolling:
+                    seats = registry.seats_of(code)
+                    with seats.lock:
+                        promoted = registry.pass_seat(seats)
+                    if promoted is not None:
+                        promotions.append((by_code[code], promoted))
+            else:
+                for code in dropping:
+                    seats = registry.seats_of(code)
+                    with seats.lock:
+                        registry.write(store.drop_course, student, by_code[code])
+                        promoted = registry.pass_seat(seats)
+                    if promoted is not None:
+                        promotions.append((by_code[code], promoted))
+                for code in enrolling:
+                    with registry.seats_of(code).lock:
+                        registry.write(store.add_course, student, by_code[code])
+                for code in waiting:
+                    seats = registry.seats_of(code)
+                    with seats.lock:
+                        seats.waiting.append(self.matric)
+                        registry.write(store.join_waitlist, student, by_code[code])
+        for course, matric in promotions:
+            registry.promote(course, matric)
+        if error:
+            raise RegistrationError(error)
+        for code in waiting:
+            registry.fill_seats(code)  # a seat may have opened since we chose to wait
+        return self.courses()
+
+    def timetable_error(self, codes, dropping):
+        # why enrolling in exactly `codes` breaks the registration rules, else None
+        catalog = self.catalog
+        total = sum(catalog.by_code[code]["credit"] for code in codes)
+        if total > MAX_CREDITS:
+            return f"Cannot apply timetable! {total} credits exceeds the {MAX_CREDITS} maximum."
+        if dropping and total < MIN_CREDITS:
+            return (
+                f"Cannot apply timetable! Only {total} credits would be enrolled (full courses "
+                f"are waitlisted), below the {MIN_CREDITS} minimum."
+            )
+        for j, code in enumerate(codes):
+            clash = catalog.find_clash(catalog.by_code[code], codes[:j])
+            if clash:
+                other, slot = clash
+                return (
+                    f"Cannot apply timetable! {code} conflicts with {other['code']} "
+                    f"on {format_slot(slot)}"
+                )
+        return None
+
+    @timed("session_timetable")
+    def timetable(self, days=DAYS[:5], hours=range(8, 17)):
+        # {day: [code or None per hour]}
+        grid = {day: [None] * len(hours) for day in days}
+        first = hours[0]
+        for code in self.student["registered_courses"]:
+            for day_index, start, end in self.catalog.slots.get(code, ()):
+                if day_index >= len(days):
+                    continue
+                for h in range(start // 60, -(-end // 60)):
+                    if first <= h < first + len(hours):
+                        grid[days[day_index]][h - first] = code
+        return grid
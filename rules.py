@@ -0,0 +1,81 @@
+import re
+
+from slots import format_slot
+
+# registration rules shared by the CLI, the GUI and the solver
+MAX_CREDITS = 21
+MIN_CREDITS = 12
+MATRIC_PREFIX = "A25AI"
+NAME_PATTERN = re.compile(r"^[a-zA-Z\s\-\']+$")
+# name_error / matric_error as one compiled match each, for checking many records
+# at once (audit.py): a full match means the validator would return None
+VALID_NAME = re.compile(r"(?=[\s\S]{4})[a-zA-Z\-\']+(?:\s+[a-zA-Z\-\']+)+")  # stripped name
+VALID_MATRIC = re.compile(MATRIC_PREFIX + r"[0-9]{4}")  # stored form: upper case, no spaces
+
+
+# validators return an error message, or None when the value is fine; callers
+# decide whether to print it, toast it or put it in a response
+def name_error(name):
+    name = name.strip()
+    if len(name) < 4:
+        return "Name is too short (minimum 4 characters)."
+    if len(name.split()) < 2:
+        return "Please enter at least two words (e.g., First Last)."
+    if any(char.isdigit() for char in name):
+        return "Name cannot contain numbers."
+    if not NAME_PATTERN.match(name):
+        return "Name contains invalid characters. Only letters, spaces, hyphens, and apostrophes allowed."
+    return None
+
+
+def matric_error(matric):
+    matric = matric.strip().upper()
+    if len(matric) != 9:
+        return "Matric number must be exactly 9 characters long."
+    if not matric.startswith(MATRIC_PREFIX):
+        return f"Matric number must start with '{MATRIC_PREFIX}'."
+    if not (matric[5:].isascii() and matric[5:].isdigit()):  # "²" or "٣" are digits too
+        return "Last 4 digits of matric number must be numeric."
+    return None
+
+
+# why `course` can't be added next to the student's current registrations, else None
+def add_error(student, course, catalog):
+    total = student["total_credits"] + course["credit"]
+    if total > MAX_CREDITS:
+        return (
+            f"Cannot add! Exceeds {MAX_CREDITS} credits "
+            f"({student['total_credits']} + {course['credit']} = {total})"
+        )
+    clash = catalog.find_clash(course, student["registered_courses"])
+    if clash:
+        reg_course, slot = clash
+        return (
+            f"Cannot add {course['code']}. Conflicts with {reg_course['code']} "
+            f"({reg_course['name']}) on {format_slot(slot)}"
+        )
+    return None
+
+
+# problems with one stored student record, as messages; empty when it is valid
+def check_student(student, catalog):
+    problems = []
+    codes = student["registered_courses"]
+    unknown = [code for code in codes if catalog.get(code) is None]
+    if unknown:
+        problems.append(f"unknown course code(s): {', '.join(unknown)}")
+    credits = sum(catalog.get(code)["credit"] for code in codes if catalog.get(code))
+    if not unknown and credits != student["total_credits"]:
+        problems.append(
+            f"total_credits is {student['total_credits']} but registered courses add up to {credits}"
+        )
+    if credits > MAX_CREDITS:
+        problems.append(f"over the {MAX_CREDITS} credit maximum ({credits})")
+    if credits < MIN_CREDITS:
+        problems.append(f"under the {MIN_CREDITS} credit minimum ({credits})")
+    known = [code for code in codes if code not in unknown]
+    for j, code in enumerate(known):
+        clash = catalog.find_clash(catalog.get(code), known[:j])
+        if clash:
+            problems.append(f"{code} clashes with {clash[0]['code']}")
+    return problems
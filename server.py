@@ -0,0 +1,404 @@
+import argparse
+import asyncio
+import json
+import secrets
+import time
+from collections import OrderedDict, deque
+from urllib.parse import parse_qs, urlsplit
+
+from catalog import Catalog
+from metrics import METRICS
+from registration import Registry, RegistrationError
+from storage import open_store
+
+HOST = "127.0.0.1"
+PORT = 8080
+FLUSH_INTERVAL = 0.05  # seconds between group commits
+LATENCY_WINDOW = 1000  # recent requests kept per endpoint for the percentiles
+MAX_BODY = 64 * 1024
+SESSION_IDLE = 30 * 60  # seconds without a request before a login token expires
+SESSION_SWEEP = 60  # seconds between checks for expired tokens
+
+STATUS_TEXT = {
+    200: "OK",
+    400: "Bad Request",
+    401: "Unauthorized",
+    404: "Not Found",
+    405: "Method Not Allowed",
+    413: "Payload Too Large",
+    500: "Internal Server Error",
+    503: "Service Unavailable",
+}
+
+
+class HttpError(Exception):
+    def __init__(self, status, message):
+        super().__init__(message)
+        self.status = status
+
+
+# ==========================================
+# LATENCY STATS
+# ==========================================
+# per endpoint: total count plus the last LATENCY_WINDOW durations, which is what
+# the percentiles are taken over
+class LatencyStats:
+    def __init__(self, window=LATENCY_WINDOW):
+        self.window = window
+        self.counts = {}
+        self.samples = {}
+
+    def record(self, endpoint, seconds):
+        self.counts[endpoint] = self.counts.get(endpoint, 0) + 1
+        self.samples.setdefault(endpoint, deque(maxlen=self.window)).append(seconds)
+
+    def summary(self):
+        result = {}
+        for endpoint, samples in sorted(self.samples.items()):
+            ordered = sorted(samples)
+
+            def pct(p):
+                return ordered[min(len(ordered) - 1, int(p * len(ordered)))] * 1000
+
+            result[endpoint] = {
+                "count": self.counts[endpoint],
+                "mean_ms": sum(ordered) / len(ordered) * 1000,
+                "p50_ms": pct(0.50),
+                "p95_ms": pct(0.95),
+                "p99_ms": pct(0.99),
+                "max_ms": ordered[-1] * 1000,
+            }
+        return result
+
+
+def course_json(course):
+    return {
+        "code": course["code"],
+        "name": course["name"],
+        "credit": course["credit"],
+        "slots": course["slots"],
+        "location": course.get("location"),
+        "capacity": course.get("capacity"),
+    }
+
+
+# ==========================================
+# SERVER
+# ==========================================
+# registry calls run on the default thread pool (they take the registry's locks),
+# the store runs with autoflush off: a change only returns once the flusher task has
+# written it, and every change made in the same FLUSH_INTERVAL shares one write
+class RegistrationServer:
+    def __init__(self, registry, flush_interval=FLUSH_INTERVAL):
+        self.registry = registry
+        self.catalog = registry.catalog
+        self.flush_interval = flush_interval
+        self.sessions = OrderedDict()  # token -> [Session, last use], least recently used first
+        self.stats = LatencyStats()
+        self.waiting = []  # futures of changes not yet on disk
+        # the last group commit that failed, until one succeeds. memory is then ahead
+        # of the disk, so no more changes are taken; the flusher keeps retrying the
+        # pending ones (records replay idempotently, see storage.py)
+        self.failed = None
+        self.routes = {
+            ("POST", "/register"): self.register,
+            ("POST", "/login"): self.login,
+            ("POST", "/logout"): self.logout,
+            ("POST", "/add"): self.add,
+            ("POST", "/drop"): self.drop,
+            ("GET", "/view"): self.view,
+            ("GET", "/timetable"): self.timetable,
+            ("GET", "/stats"): self.show_stats,
+            ("GET", "/metrics"): self.show_metrics,
+        }
+
+    # GROUP COMMIT
+    async def flusher(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            await asyncio.sleep(self.flush_interval)
+            if not self.waiting and self.failed is None:
+                continue
+            batch, self.waiting = self.waiting, []
+            try:
+                await loop.run_in_executor(None, self.registry.flush)
+            except Exception as e:
+                if self.failed is None:
+                    print(f"Saving failed ({type(e).__name__}: {e}); changes are paused.")
+                self.failed = e
+                for future in batch:
+                    future.set_exception(e)
+            else:
+                if self.failed is not None:
+                    print("Saving works again; changes are accepted.")
+                self.failed = None
+                for future in batch:
+                    future.set_result(None)
+
+    def check_writable(self):
+        if self.failed is not None:
+            raise HttpError(
+                503, "Changes are paused: the registration data can't be saved right now."
+            )
+
+    async def durable(self):
+        # wait for the next group commit
+        future = asyncio.get_running_loop().create_future()
+        self.waiting.append(future)
+        try:
+            await future
+        except Exception:
+            raise HttpError(
+                503,
+                "The change was made but could not be saved yet; it will be written "
+                "once saving works again, and new changes are paused until then.",
+            )
+
+    async def call(self, func, *args):
+        return await asyncio.get_running_loop().run_in_executor(None, func, *args)
+
+    # SESSIONS
+    # a token lives until logout or SESSION_IDLE seconds without a request; use moves
+    # it to the back, so the expired ones are always at the front
+    def session_of(self, params):
+        token = str(params.get("token") or "")  # a list or dict is just a wrong token
+        entry = self.sessions.get(token)
+        if entry is None:
+            raise HttpError(401, "Not logged in. POST /login first.")
+        entry[1] = time.monotonic()
+        self.sessions.move_to_end(token)
+        return entry[0]
+
+    def expire_sessions(self):
+        cutoff = time.monotonic() - SESSION_IDLE
+        while self.sessions:
+            token, (_, last_use) = next(iter(self.sessions.items()))
+            if last_use > cutoff:
+                break
+            del self.sessions[token]
+
+    async def reaper(self):
+        while True:
+            await asyncio.sleep(SESSION_SWEEP)
+            self.expire_sessions()
+
+    # HELPERS
+    def course_of(self, params):
+        query = str(params.get("course") or "")
+        course = self.catalog.lookup(query)
+        if course is None:
+            matches = self.catalog.search(query) if query.strip() else []
+            if len(matches) != 1:
+                raise HttpError(
+                    400,
+                    "Course not found." if not matches
+                    else f"'{query}' matches {len(matches)} courses; use the full code.",
+                )
+            course = matches[0]
+        return course
+
+    def student_json(self, session):
+        student = session.student
+        return {
+            "name": student["name"],
+            "matric": student["matric"],
+            "total_credits": student["total_credits"],
+            "courses": [course_json(c) for c in session.courses()],
+            "waitlisted": [
+                {"code": c["code"], "position": position} for c, position in session.waitlist()
+            ],
+        }
+
+    def open_session(self, session):
+        token = secrets.token_hex(16)
+        self.sessions[token] = [session, time.monotonic()]
+        return {"token": token, "student": self.student_json(session)}
+
+    # ENDPOINTS
+    async def register(self, params):
+        self.check_writable()
+        session = await self.call(
+            self.registry.register, str(params.get("name", "")), str(params.get("matric", ""))
+        )
+        await self.durable()
+        return self.open_session(session)
+
+    async def login(self, params):
+        session = await self.call(self.registry.login, str(params.get("matric", "")))
+        return self.open_session(session)
+
+    async def logout(self, params):
+        self.session_of(params)
+        del self.sessions[params["token"]]
+        return {"ok": True}
+
+    async def add(self, params):
+        self.check_writable()
+        session = self.session_of(params)
+        course = self.course_of(params)
+        status = await self.call(session.add, course)
+        await self.durable()
+        return {"code": course["code"], "status": status, "student": self.student_json(session)}
+
+    async def drop(self, params):
+        self.check_writable()
+        session = self.session_of(params)
+        course = await self.call(session.drop, self.course_of(params))
+        await self.durable()
+        return {"dropped": course["code"], "student": self.student_json(session)}
+
+    async def view(self, params):
+        return self.student_json(self.session_of(params))
+
+    async def timetable(self, params):
+        return {"timetable": self.session_of(params).timetable()}
+
+    async def show_stats(self, params):
+        return {"endpoints": self.stats.summary(), "sessions": len(self.sessions)}
+
+    async def show_metrics(self, params):
+        # Prometheus text format; empty unless TIMETABLE_METRICS is set
+        return METRICS.prometheus()
+
+    # HTTP
+    async def dispatch(self, method, target, body):
+        url = urlsplit(target)
+        handler = self.routes.get((method, url.path))
+        if handler is None:
+            if any(path == url.path for _, path in self.routes):
+                raise HttpError(405, f"{method} not allowed on {url.path}")
+            raise HttpError(404, f"No endpoint {url.path}")
+        params = {k: v[-1] for k, v in parse_qs(url.query).items()}
+        if body:
+            try:
+                data = json.loads(body)
+            except ValueError:
+                raise HttpError(400, "Request body is not valid JSON.")
+            if not isinstance(data, dict):
+                raise HttpError(400, "Request body must be a JSON object.")
+            params.update(data)
+        started = time.perf_counter()
+        try:
+            return await handler(params)
+        finally:
+            elapsed = time.perf_counter() - started
+            self.stats.record(url.path, elapsed)
+            METRICS.observe("server_request", elapsed, endpoint=url.path)
+
+    async def handle_connection(self, reader, writer):
+        try:
+            while True:
+                try:
+                    head = await reader.readuntil(b"\r\n\r\n")
+                except (asyncio.IncompleteReadError, asyncio.LimitOverrunError):
+                    break
+                lines = head.decode("latin-1").split("\r\n")
+                try:
+                    method, target, version = lines[0].split(" ", 2)
+                except ValueError:
+                    break
+                headers = {}
+                for line in lines[1:]:
+                    if ":" in line:
+                        name, value = line.split(":", 1)
+                        headers[name.strip().lower()] = value.strip()
+                keep_alive = (
+                    headers.get("connection", "").lower() != "close"
+                    if version == "HTTP/1.1"
+                    else headers.get("connection", "").lower() == "keep-alive"
+                )
+
+                length = headers.get("content-length", "0")
+                length = int(length) if length.isascii() and length.isdigit() else None
+                if length is None:
+                    # the body's end can't be found, so neither can the next request
+                    status, payload, keep_alive = 400, {"error": "Invalid Content-Length."}, False
+                elif length > MAX_BODY:
+                    status, payload, keep_alive = 413, {"error": "Request body too large."}, False
+                else:
+                    body = await reader.readexactly(length) if length else b""
+                    try:
+                        status, payload = 200, await self.dispatch(method, target, body)
+                    except HttpError as e:
+                        status, payload = e.status, {"error": str(e)}
+                    except RegistrationError as e:
+                        status, payload = 400, {"error": str(e)}
+                    except Exception as e:
+                        status, payload = 500, {"error": f"{type(e).__name__}: {e}"}
+
+                if isinstance(payload, str):  # /metrics
+                    content_type, data = "text/plain; version=0.0.4", payload.encode()
+                else:
+                    content_type, data = "application/json", json.dumps(payload).encode()
+                writer.write(
+                    (
+                        f"HTTP/1.1 {status} {STATUS_TEXT[status]}\r\n"
+                        f"Content-Type: {content_type}\r\n"
+                        f"Content-Length: {len(data)}\r\n"
+                        f"Connection: {'keep-alive' if keep_alive else 'close'}\r\n\r\n"
+                    ).encode()
+                    + data
+                )
+                await writer.drain()
+                if not keep_alive:
+                    break
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            writer.close()
+
+    async def serve(self, host=HOST, port=PORT):
+        server = await asyncio.start_server(self.handle_connection, host, port)
+        flusher = asyncio.create_task(self.flusher())
+        reaper = asyncio.create_task(self.reaper())
+        print(f"Registration server on http://{host}:{port} (Ctrl+C to stop)")
+        try:
+            async with server:
+                await server.serve_forever()
+        finally:
+            flusher.cancel()
+            reaper.cancel()
+            for future in self.waiting:
+                future.cancel()
+
+
+def load_registry():
+    store = open_store()
+    store.autoflush = False  # writes go out in batches, see RegistrationServer.flusher
+    try:
+        catalog = Catalog(store.courses())
+    except FileNotFoundError:
+        catalog = Catalog([])
+    if not catalog:
+        raise SystemExit("Error: courses.json not found! Please ensure it exists.")
+    return Registry(store, catalog)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        prog="server", description="JSON-over-HTTP registration server."
+    )
+    parser.add_argument("--host", default=HOST)
+    parser.add_argument("--port", type=int, default=PORT)
+    parser.add_argument(
+        "--flush-interval",
+        type=float,
+        default=FLUSH_INTERVAL,
+        help="seconds between batched disk writes (default %(default)s)",
+    )
+    args = parser.parse_args(argv)
+
+    METRICS.start()
+    registry = load_registry()
+    server = RegistrationServer(registry, args.flush_interval)
+    try:
+        asyncio.run(server.serve(args.host, args.port))
+    except KeyboardInterrupt:
+        pass
+    finally:
+        registry.close()  # anything still pending is written here
+        print("Data saved.")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,65 @@
+DAYS = ["Monday", "Tuesday", "Wednesday", "Thursday", "Friday", "Saturday", "Sunday"]
+DAY_INDEX = {day: i for i, day in enumerate(DAYS)}
+
+SLOT_MINUTES = 5  # default mask granularity, see Catalog(granularity=...)
+DAY_BITS = 24 * 60 // SLOT_MINUTES
+
+
+# ==========================================
+# PARSING (done once per course, at catalog load)
+# ==========================================
+def parse_time(text):
+    hours, minutes = text.strip().split(":")
+    return int(hours) * 60 + int(minutes)
+
+
+def parse_slot(slot):
+    # ["Monday", "08:00-10:00"] -> (0, 480, 600); None for days we don't schedule
+    day, time_range = slot
+    day_index = DAY_INDEX.get(day.strip().title())
+    if day_index is None:
+        return None
+    start_str, end_str = time_range.split("-")
+    return (day_index, parse_time(start_str), parse_time(end_str))
+
+
+def parse_slots(course):
+    parsed = (parse_slot(slot) for slot in course["slots"])
+    return tuple(p for p in parsed if p is not None)
+
+
+# ==========================================
+# BITMASKS
+# ==========================================
+# one int per course: day d occupies bits [d * DAY_BITS, (d + 1) * DAY_BITS),
+# one bit per SLOT_MINUTES. courses whose masks share no bit never clash; a shared
+# bit is only a clash for certain when every time falls on the grid, so callers
+# confirm hits with overlapping_slot.
+def slot_mask(day_index, start, end, granularity=SLOT_MINUTES):
+    day_bits = 24 * 60 // granularity
+    first = start // granularity
+    last = -(-end // granularity)  # round the end up so partial cells still count
+    if last <= first:
+        return 0
+    return ((1 << (last - first)) - 1) << (day_index * day_bits + first)
+
+
+def slots_mask(parsed_slots, granularity=SLOT_MINUTES):
+    mask = 0
+    for day_index, start, end in parsed_slots:
+        mask |= slot_mask(day_index, start, end, granularity)
+    return mask
+
+
+def format_slot(parsed_slot):
+    day_index, start, end = parsed_slot
+    return f"{DAYS[day_index]} {start // 60:02d}:{start % 60:02d}-{end // 60:02d}:{end % 60:02d}"
+
+
+def overlapping_slot(slots_a, slots_b):
+    # exact minute comparison, run once a mask hit is known: confirms it and words the message
+    for a in slots_a:
+        for b in slots_b:
+            if a[0] == b[0] and max(a[1], b[1]) < min(a[2], b[2]):
+                return b
+    return None
@@ -0,0 +1,100 @@
+import heapq
+import time
+
+from rules import MAX_CREDITS, MIN_CREDITS
+
+TIME_BUDGET = 2.0  # seconds a single search may run before it stops yielding
+SUGGESTIONS = 5
+
+
+# ==========================================
+# SEARCH
+# ==========================================
+# backtracking over candidate courses; a branch is cut as soon as the next course
+# clashes (one AND against the conflict graph), overshoots max_credits, or the
+# courses left can no longer lift it to min_credits
+def solve(
+    catalog,
+    required=(),
+    optional=None,
+    min_credits=MIN_CREDITS,
+    max_credits=MAX_CREDITS,
+    time_budget=TIME_BUDGET,
+):
+    deadline = time.monotonic() + time_budget
+    conflicts = catalog.conflicts
+
+    required = [code for code in dict.fromkeys(required) if code in catalog.index]
+    chosen_bits = 0
+    credits = 0
+    for code in required:
+        i = catalog.index[code]
+        if conflicts[i] & chosen_bits:
+            return  # the required courses already clash with each other
+        chosen_bits |= 1 << i
+        credits += catalog.by_code[code]["credit"]
+    if credits > max_credits:
+        return
+
+    if optional is None:
+        optional = [course["code"] for course in catalog]
+    candidates = []
+    for code in dict.fromkeys(optional):
+        i = catalog.index.get(code)
+        if i is None or (chosen_bits >> i) & 1 or conflicts[i] & chosen_bits:
+            continue
+        candidates.append((i, catalog.by_code[code]["credit"], code))
+
+    # credits still reachable from position j onwards, for the min_credits bound
+    reachable = [0] * (len(candidates) + 1)
+    for j in range(len(candidates) - 1, -1, -1):
+        reachable[j] = reachable[j + 1] + candidates[j][1]
+
+    picked = list(required)
+    steps = 0
+
+    def extend(start, bits, total):
+        nonlocal steps
+        if total >= min_credits:
+            yield list(picked)
+        for j in range(start, len(candidates)):
+            steps += 1
+            if steps & 0xFF == 0 and time.monotonic() > deadline:
+                return
+            if total + reachable[j] < min_credits:
+                return
+            i, credit, code = candidates[j]
+            if total + credit > max_credits or conflicts[i] & bits:
+                continue
+            picked.append(code)
+            yield from extend(j + 1, bits | (1 << i), total + credit)
+            picked.pop()
+            if time.monotonic() > deadline:
+                return
+
+    yield from extend(0, chosen_bits, credits)
+
+
+# ==========================================
+# RANKING
+# ==========================================
+# more credits first, then fewer days on campus, then less idle time between classes
+def timetable_score(catalog, codes):
+    credits = 0
+    by_day = {}
+    for code in codes:
+        credits += catalog.by_code[code]["credit"]
+        for day_index, start, end in catalog.slots[code]:
+            by_day.setdefault(day_index, []).append((start, end))
+    idle = 0
+    for spans in by_day.values():
+        spans.sort()
+        for (_, prev_end), (next_start, _) in zip(spans, spans[1:]):
+            idle += max(0, next_start - prev_end)
+    return (credits, -len(by_day), -idle)
+
+
+def best_timetables(catalog, required=(), optional=None, limit=SUGGESTIONS, **options):
+    results = solve(catalog, required, optional, **options)
+    return heapq.nlargest(limit, results, key=lambda codes: timetable_score(catalog, codes))
+
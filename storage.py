@@ -0,0 +1,890 @@
+import json
+import os
+import sys
+import threading
+import time
+
+from metrics import timed
+
+STUDENTS_FILE = "students.json"
+COURSES_FILE = "courses.json"
+JOURNAL_FILE = "students.journal"
+WAITLIST_FILE = "waitlists.json"
+DATABASE_FILE = "registration.db"
+STORAGE_ENGINE = os.environ.get("TIMETABLE_STORAGE", "json")  # "json" or "sqlite"
+COMPACT_EVERY = 500  # journal records allowed to pile up before the snapshot is rewritten
+WRITE_DELAY = 0.5  # write-behind: seconds of quiet before buffered changes are written
+MAX_WRITE_DELAY = 5.0  # ... but never held longer than this while changes keep coming
+
+
+# ==========================================
+# RECORD FORMAT
+# ==========================================
+# students keep course codes only: {"registered_courses": ["SAIA1113", ...]}.
+# files written before that embedded a full course dict per registration and
+# are upgraded on load
+def entry_code(entry):
+    return entry if isinstance(entry, str) else entry["code"]
+
+
+def normalize_student(student):
+    courses = student["registered_courses"]
+    upgraded = any(not isinstance(c, str) for c in courses)
+    # interned so every student shares one string object per course code
+    student["registered_courses"] = [sys.intern(entry_code(c)) for c in courses]
+    return upgraded
+
+
+# ==========================================
+# JOURNAL REPLAY
+# ==========================================
+# every record is applied as "make it so" rather than "do it again", so replaying
+# a journal on top of a snapshot that already contains some of its records
+# (crash in the middle of a compaction) still ends in the right state
+def apply_record(students, by_matric, record, waitlists=None):
+    op = record["op"]
+    if op in ("wait", "unwait"):
+        if waitlists is not None:
+            queue = waitlists.setdefault(record["code"], [])
+            if op == "wait" and record["matric"] not in queue:
+                queue.append(record["matric"])
+            elif op == "unwait" and record["matric"] in queue:
+                queue.remove(record["matric"])
+        return
+    if op == "register":
+        student = record["student"]
+        if student["matric"] not in by_matric:
+            students.append(student)
+            by_matric[student["matric"]] = student
+        return
+
+    student = by_matric.get(record["matric"])
+    if student is None:
+        return
+    courses = student["registered_courses"]
+    if op == "add":
+        # old journals carry the whole course dict instead of code + credit
+        course = record.get("course")
+        code = course["code"] if course else record["code"]
+        if all(entry_code(c) != code for c in courses):
+            courses.append(course or code)
+            student["total_credits"] += course["credit"] if course else record["credit"]
+    elif op == "drop":
+        for c in courses:
+            if entry_code(c) == record["code"]:
+                courses.remove(c)
+                student["total_credits"] -= (
+                    record["credit"] if "credit" in record else c["credit"]
+                )
+                break
+    if "total" in record:
+        # add / drop records carry the total they left behind, so a record replayed
+        # over a snapshot that already holds its course still sets the right total
+        student["total_credits"] = record["total"]
+
+
+def write_json(path, data):
+    # all-or-nothing: a crash leaves either the old file or the new one
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "w") as f:
+        json.dump(data, f, indent=4)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_path, path)
+
+
+# ==========================================
+# JSON STORE (snapshot + append-only journal)
+# ==========================================
+# waitlists ({code: [matric, ...]}, first in line first) share the journal and get
+# their own snapshot file, which only appears once someone has been waitlisted
+class JsonStore:
+    def __init__(
+        self,
+        path=STUDENTS_FILE,
+        journal_path=JOURNAL_FILE,
+        courses_path=COURSES_FILE,
+        compact_every=COMPACT_EVERY,
+        waitlist_path=WAITLIST_FILE,
+    ):
+        self.path = path
+        self.journal_path = journal_path
+        self.courses_path = courses_path
+        self.waitlist_path = waitlist_path
+        self.compact_every = compact_every
+        self.students = []
+        self.by_matric = {}  # matric -> student, kept in step with self.students
+        self.waiting = {}  # code -> matrics in waitlist order
+        self.journal_size = 0
+        # autoflush=False: records wait in memory until flush() writes them with a
+        # single write + fsync (group commit, used by the server)
+        self.autoflush = True
+        self.on_change = None  # called after a change is buffered, see WriteBehind
+        self.pending = []
+        self.pending_lock = threading.Lock()
+        self.file_lock = threading.RLock()  # journal appends vs. compaction
+        # held while a change is made in memory (never across I/O), so compaction can't
+        # copy a student between the course list changing and the total following it
+        self.state_lock = threading.Lock()
+        self.read_only = False  # set by load_one: memory holds one student, never write it out
+
+    @timed("store_load", engine="json")
+    def load(self):
+        try:
+            with open(self.path, "r") as f:
+                self.students = json.load(f)
+        except FileNotFoundError:
+            self.students = []
+        self.by_matric = {s["matric"]: s for s in self.students}
+        try:
+            with open(self.waitlist_path, "r") as f:
+                self.waiting = json.load(f)
+        except FileNotFoundError:
+            self.waiting = {}
+        self.journal_size = self.replay()
+        upgraded = False
+        for student in self.students:
+            upgraded = normalize_student(student) or upgraded
+        if upgraded:
+            self.compact()  # rewrite once in the code-only format
+        return self.students
+
+    def load_one(self, matric):
+        # one-shot commands: only `matric`'s record is decoded and only its journal
+        # records (plus the waitlist ones) replayed; no upgrade, no compaction, and the
+        # store refuses writes, since the rest of the students were never read
+        self.read_only = True
+        student = self.scan_snapshot(matric)
+        self.students = [student] if student is not None else []
+        self.by_matric = {matric: student} if student is not None else {}
+        try:
+            with open(self.waitlist_path, "r") as f:
+                self.waiting = json.load(f)
+        except FileNotFoundError:
+            self.waiting = {}
+        self.replay(json.dumps(matric).encode())
+        for student in self.students:
+            normalize_student(student)  # in memory only
+        return self.by_matric.get(matric)
+
+    def scan_snapshot(self, matric):
+        # find the quoted matric in students.json and decode just the object around it:
+        # the nearest "{" before it, or one further back when that was a course dict
+        # embedded by an old file. the last record wins, as in load()
+        try:
+            with open(self.path, "r") as f:
+                text = f.read()
+        except FileNotFoundError:
+            return None
+        decode = json.JSONDecoder().raw_decode
+        needle = json.dumps(matric)
+        hit = text.rfind(needle)
+        while hit != -1:
+            start = text.rfind("{", 0, hit)
+            while start != -1:
+                try:
+                    value, end = decode(text, start)
+                except ValueError:  # a "{" inside a string
+                    start = text.rfind("{", 0, start)
+                    continue
+                if end <= hit or not isinstance(value, dict):
+                    break  # the hit isn't inside an object
+                if "matric" in value:
+                    if value["matric"] == matric:
+                        return value
+                    break
+                start = text.rfind("{", 0, start)
+            hit = text.rfind(needle, 0, hit)
+        return None
+
+    def replay(self, only=None):
+        # only: bytes that a record must contain to be applied (load_one); waitlist
+        # records are always applied, a queue position depends on everyone in it
+        try:
+            f = open(self.journal_path, "rb")
+        except FileNotFoundError:
+            return 0
+        count = 0
+        good = 0  # byte offset just past the last complete record
+        torn = False
+        with f:
+            for line in f:
+                # a record only counts once its newline made it to disk: append()
+                # writes both in one go, so anything short of that was never acknowledged
+                if not line.endswith(b"\n"):
+                    torn = True
+                    break
+                if only is not None and only not in line and b'wait"' not in line:
+                    good += len(line)
+                    continue
+                if line.strip():
+                    try:
+                        record = json.loads(line)
+                    except ValueError:
+                        torn = True  # torn line from a crash mid-write
+                        break
+                    apply_record(self.students, self.by_matric, record, self.waiting)
+                    count += 1
+                good += len(line)
+        if torn and not self.read_only:
+            # cut the garbage off, or the next append lands on the same line and
+            # takes every record after it down with it on the next load
+            with open(self.journal_path, "r+b") as f:
+                f.truncate(good)
+                f.flush()
+                os.fsync(f.fileno())
+        return count
+
+    # READS
+    def courses(self, codes=None):
+        # codes: only return these courses (one-shot commands that touch one student)
+        with open(self.courses_path, "r") as f:
+            courses = json.load(f)
+        if codes is not None:
+            wanted = set(codes)
+            courses = [c for c in courses if c["code"] in wanted]
+        return courses
+
+    def get_student(self, matric):
+        return self.by_matric.get(matric)
+
+    def iter_students(self):
+        return iter(self.students)
+
+    def enrollment_counts(self):
+        counts = {}
+        for student in self.students:
+            for code in student["registered_courses"]:
+                counts[code] = counts.get(code, 0) + 1
+        return counts
+
+    def waitlists(self):
+        return {code: list(queue) for code, queue in list(self.waiting.items()) if queue}
+
+    def registered_in(self, codes):
+        # -> {code: [matric, ...]} for the students registered in each of `codes`
+        wanted = set(codes)
+        result = {code: [] for code in wanted}
+        for student in self.students:
+            for code in student["registered_courses"]:
+                if code in wanted:
+                    result[code].append(student["matric"])
+        return result
+
+    def update_courses(self, courses, removed):
+        pass  # courses.json itself is the catalog; nothing else keeps a copy
+
+    # WRITES: one small journal record per change
+    def register(self, student):
+        with self.state_lock:
+            self.students.append(student)
+            self.by_matric[student["matric"]] = student
+        self.append(
+            {
+                "op": "register",
+                "student": {
+                    "name": student["name"],
+                    "matric": student["matric"],
+                    "registered_courses": list(student["registered_courses"]),
+                    "total_credits": student["total_credits"],
+                },
+            }
+        )
+
+    def add_course(self, student, course):
+        with self.state_lock:
+            student["registered_courses"].append(course["code"])
+            student["total_credits"] += course["credit"]
+            total = student["total_credits"]
+        self.append(
+            {
+                "op": "add",
+                "matric": student["matric"],
+                "code": course["code"],
+                "credit": course["credit"],
+                "total": total,
+            }
+        )
+
+    def drop_course(self, student, course):
+        with self.state_lock:
+            student["registered_courses"].remove(course["code"])
+            student["total_credits"] -= course["credit"]
+            total = student["total_credits"]
+        self.append(
+            {
+                "op": "drop",
+                "matric": student["matric"],
+                "code": course["code"],
+                "credit": course["credit"],
+                "total": total,
+            }
+        )
+
+    def set_credits(self, student, total):
+        # a course's credits changed in the catalog (see Registry.reload_catalog)
+        with self.state_lock:
+            student["total_credits"] = total
+        self.append({"op": "credits", "matric": student["matric"], "total": total})
+
+    def join_waitlist(self, student, course):
+        with self.state_lock:
+            self.waiting.setdefault(course["code"], []).append(student["matric"])
+        self.append({"op": "wait", "matric": student["matric"], "code": course["code"]})
+
+    def leave_waitlist(self, student, course):
+        with self.state_lock:
+            queue = self.waiting.get(course["code"], [])
+            if student["matric"] in queue:
+                queue.remove(student["matric"])
+        self.append({"op": "unwait", "matric": student["matric"], "code": course["code"]})
+
+    def append(self, record):
+        if self.read_only:
+            raise RuntimeError("store was opened for one student (load_one) and is read-only")
+        line = json.dumps(record, separators=(",", ":")) + "\n"
+        if self.autoflush:
+            self.write_journal([line])
+        else:
+            with self.pending_lock:
+                self.pending.append(line)
+            if self.on_change:
+                self.on_change()
+
+    def flush(self):
+        with self.pending_lock:
+            lines, self.pending = self.pending, []
+        if lines:
+            try:
+                self.write_journal(lines)
+            except OSError:
+                # put them back for the next flush; records replay idempotently, so
+                # any that did reach the disk being written again is harmless
+                with self.pending_lock:
+                    self.pending[:0] = lines
+                raise
+
+    def checkpoint(self):
+        # bulk loads: fold everything held in memory straight into the snapshot, one
+        # write however many changes are pending (they never touch the journal)
+        with self.pending_lock:
+            self.pending = []
+        self.compact()
+
+    @timed("store_write", engine="json")
+    def write_journal(self, lines):
+        with self.file_lock:
+            with open(self.journal_path, "a") as f:
+                f.write("".join(lines))
+                f.flush()
+                os.fsync(f.fileno())
+            self.journal_size += len(lines)
+            if self.journal_size >= self.compact_every:
+                self.compact()
+
+    # COMPACTION: fold the journal back into students.json
+    @timed("store_compact", engine="json")
+    def compact(self):
+        # copy first: another thread may be adding/dropping while the file is written.
+        # the copy is taken under file_lock, so no record reaches the journal between
+        # it and the truncation below, and under state_lock, so every change in it is
+        # whole. records still pending are flushed to the fresh journal afterwards
+        with self.file_lock:
+            with self.state_lock:
+                students = [
+                    dict(s, registered_courses=list(s["registered_courses"]))
+                    for s in self.students
+                ]
+                waitlists = self.waitlists()
+            if waitlists or os.path.exists(self.waitlist_path):
+                write_json(self.waitlist_path, waitlists)
+            write_json(self.path, students)
+            open(self.journal_path, "w").close()
+            self.journal_size = 0
+
+    def close(self):
+        if self.read_only:
+            return  # nothing was written, and a compaction would drop everyone else
+        self.flush()
+        self.compact()
+
+
+# ==========================================
+# SQLITE STORE (indexed, one transaction per change)
+# ==========================================
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS students (
+    matric TEXT PRIMARY KEY,
+    name TEXT NOT NULL,
+    total_credits INTEGER NOT NULL DEFAULT 0
+);
+CREATE TABLE IF NOT EXISTS courses (
+    code TEXT PRIMARY KEY,
+    name TEXT NOT NULL,
+    credit INTEGER NOT NULL,
+    slots TEXT NOT NULL,
+    location TEXT NOT NULL DEFAULT '',
+    capacity INTEGER
+);
+CREATE TABLE IF NOT EXISTS registrations (
+    matric TEXT NOT NULL REFERENCES students(matric),
+    code TEXT NOT NULL,
+    position INTEGER NOT NULL,
+    PRIMARY KEY (matric, code)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS registrations_by_code ON registrations(code);
+CREATE TABLE IF NOT EXISTS waitlist (
+    code TEXT NOT NULL,
+    position INTEGER NOT NULL,
+    matric TEXT NOT NULL REFERENCES students(matric),
+    PRIMARY KEY (code, position)
+) WITHOUT ROWID;
+CREATE UNIQUE INDEX IF NOT EXISTS waitlist_by_student ON waitlist(code, matric);
+"""
+
+
+def course_row(course):
+    return (
+        course["code"],
+        course["name"],
+        course["credit"],
+        json.dumps(course["slots"]),
+        course.get("location", ""),
+        course.get("capacity"),
+    )
+
+
+def course_from_row(row):
+    code, name, credit, slots, location, capacity = row
+    course = {
+        "code": code,
+        "name": name,
+        "credit": credit,
+        "slots": json.loads(slots),
+        "location": location,
+    }
+    if capacity is not None:  # same shape as courses.json, where the field is optional
+        course["capacity"] = capacity
+    return course
+
+
+class SqliteStore:
+    def __init__(self, path=DATABASE_FILE):
+        self.path = path
+        self.courses_path = COURSES_FILE  # edits to it reach the courses table, see update_courses
+        self.conn = None
+        self.autoflush = True  # False: changes are queued and share one transaction, see write
+        self.on_change = None
+        self.lock = threading.RLock()  # the connection is shared between threads
+        self.pending = []  # (sql, params) of queued changes not yet run on the connection
+        self.pending_lock = threading.Lock()
+        self.lost = None  # set when a failed commit took buffered changes with it
+
+    @timed("store_load", engine="sqlite")
+    def load(self):
+        import sqlite3  # here rather than at the top: the JSON engine never needs it
+
+        # shared by registry / server threads; self.lock serializes every call
+        self.conn = sqlite3.connect(self.path, check_same_thread=False)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.executescript(SCHEMA)
+        columns = [row[1] for row in self.conn.execute("PRAGMA table_info(courses)")]
+        if "capacity" not in columns:  # database created before seat limits
+            self.conn.execute("ALTER TABLE courses ADD COLUMN capacity INTEGER")
+        # first run on an existing install: pull the JSON files in once
+        if self.conn.execute("SELECT 1 FROM courses LIMIT 1").fetchone() is None:
+            self.migrate_json()
+
+    def migrate_json(
+        self,
+        students_path=STUDENTS_FILE,
+        courses_path=COURSES_FILE,
+        journal_path=JOURNAL_FILE,
+        waitlist_path=WAITLIST_FILE,
+    ):
+        json_store = JsonStore(
+            students_path, journal_path, courses_path, waitlist_path=waitlist_path
+        )
+        json_store.load()
+        try:
+            courses = json_store.courses()
+        except FileNotFoundError:
+            courses = []
+        with self.conn:
+            self.conn.executemany(
+                "INSERT OR REPLACE INTO courses VALUES (?, ?, ?, ?, ?, ?)",
+                [course_row(c) for c in courses],
+            )
+            for student in json_store.iter_students():
+                self.conn.execute(
+                    "INSERT OR REPLACE INTO students VALUES (?, ?, ?)",
+                    (student["matric"], student["name"], student["total_credits"]),
+                )
+                # the JSON list replaces whatever the database held for this student
+                self.conn.execute(
+                    "DELETE FROM registrations WHERE matric = ?", (student["matric"],)
+                )
+                self.conn.executemany(
+                    "INSERT OR REPLACE INTO registrations VALUES (?, ?, ?)",
+                    [
+                        (student["matric"], code, position)
+                        for position, code in enumerate(student["registered_courses"])
+                    ],
+                )
+            for code, queue in json_store.waitlists().items():
+                self.conn.execute("DELETE FROM waitlist WHERE code = ?", (code,))
+                self.conn.executemany(
+                    "INSERT INTO waitlist VALUES (?, ?, ?)",
+                    [(code, position, matric) for position, matric in enumerate(queue)],
+                )
+
+    def write(self, statements):
+        # statements: [(sql, params)] making up one change. autoflush: run as their own
+        # transaction now. otherwise only queued, so the thread making the change (the
+        # Tk main loop) never waits for self.lock while a flush is committing
+        if self.autoflush:
+            with self.lock, self.conn:
+                for sql, params in statements:
+                    self.conn.execute(sql, params)
+            return
+        with self.pending_lock:
+            self.pending.extend(statements)
+        if self.on_change:
+            self.on_change()
+
+    def run_pending(self):
+        # with self.lock held: run the queued changes in the open transaction, so reads
+        # on this connection see them; flush() commits them
+        with self.pending_lock:
+            statements, self.pending = self.pending, []
+        for n, (sql, params) in enumerate(statements):
+            try:
+                self.conn.execute(sql, params)
+            except Exception:
+                with self.pending_lock:
+                    self.pending[:0] = statements[n:]  # retried by the next flush
+                raise
+
+    @timed("store_write", engine="sqlite")
+    def flush(self):
+        with self.lock:
+            if self.lost:
+                raise self.lost
+            self.run_pending()
+            try:
+                self.conn.commit()
+            except Exception as e:
+                if self.conn.in_transaction:
+                    raise  # still open (e.g. busy): the next flush retries it
+                # sqlite rolled the batch back, so memory is ahead of the database for
+                # good; every later flush fails too, until a restart reloads
+                self.lost = RuntimeError(f"buffered changes were rolled back: {e}")
+                raise self.lost from e
+
+    def checkpoint(self):
+        self.flush()  # with autoflush off, everything since the last flush is one transaction
+
+    # READS
+    def courses(self, codes=None):
+        with self.lock:
+            self.run_pending()
+            return self.read_courses(codes)
+
+    def read_courses(self, codes):
+        if codes is None:
+            rows = self.conn.execute(
+                "SELECT code, name, credit, slots, location, capacity FROM courses ORDER BY rowid"
+            )
+        else:
+            codes = list(codes)
+            rows = self.conn.execute(
+                "SELECT code, name, credit, slots, location, capacity FROM courses"
+                f" WHERE code IN ({', '.join('?' * len(codes))}) ORDER BY rowid",
+                codes,
+            )
+        return [course_from_row(r) for r in rows]
+
+    def get_student(self, matric):
+        with self.lock:
+            self.run_pending()
+            return self.read_student(matric)
+
+    def read_student(self, matric):
+        row = self.conn.execute(
+            "SELECT matric, name, total_credits FROM students WHERE matric = ?",
+            (matric,),
+        ).fetchone()
+        if row is None:
+            return None
+        rows = self.conn.execute(
+            "SELECT code FROM registrations WHERE matric = ? ORDER BY position",
+            (matric,),
+        )
+        return {
+            "name": row[1],
+            "matric": row[0],
+            "registered_courses": [sys.intern(code) for (code,) in rows],
+            "total_credits": row[2],
+        }
+
+    def iter_students(self):
+        with self.lock:
+            self.run_pending()
+            matrics = self.conn.execute("SELECT matric FROM students ORDER BY rowid").fetchall()
+        for (matric,) in matrics:
+            yield self.get_student(matric)
+
+    def enrollment_counts(self):
+        with self.lock:
+            self.run_pending()
+            return dict(
+                self.conn.execute("SELECT code, COUNT(*) FROM registrations GROUP BY code")
+            )
+
+    def waitlists(self):
+        waitlists = {}
+        with self.lock:
+            self.run_pending()
+            rows = self.conn.execute(
+                "SELECT code, matric FROM waitlist ORDER BY code, position"
+            ).fetchall()
+        for code, matric in rows:
+            waitlists.setdefault(code, []).append(matric)
+        return waitlists
+
+    def registered_in(self, codes):
+        codes = list(codes)
+        result = {code: [] for code in codes}
+        with self.lock:
+            self.run_pending()
+            rows = self.conn.execute(
+                "SELECT code, matric FROM registrations"
+                f" WHERE code IN ({', '.join('?' * len(codes))})",
+                codes,
+            ).fetchall()
+        for code, matric in rows:
+            result[code].append(matric)
+        return result
+
+    # WRITES
+    def update_courses(self, courses, removed):
+        # courses: added or changed course dicts; removed: codes. an upsert updates the
+        # row in place, so the catalog order (rowid) stays the courses.json order
+        statements = [
+            (
+                "INSERT INTO courses VALUES (?, ?, ?, ?, ?, ?) ON CONFLICT(code) DO UPDATE"
+                " SET name = excluded.name, credit = excluded.credit, slots = excluded.slots,"
+                " location = excluded.location, capacity = excluded.capacity",
+                course_row(course),
+            )
+            for course in courses
+        ]
+        statements += [("DELETE FROM courses WHERE code = ?", (code,)) for code in removed]
+        self.write(statements)
+
+    def register(self, student):
+        self.write(
+            [
+                (
+                    "INSERT INTO students VALUES (?, ?, ?)",
+                    (student["matric"], student["name"], student["total_credits"]),
+                )
+            ]
+        )
+
+    def add_course(self, student, course):
+        self.write(
+            [
+                (
+                    "INSERT INTO registrations VALUES (?, ?, (SELECT COALESCE(MAX(position) + 1, 0)"
+                    " FROM registrations WHERE matric = ?))",
+                    (student["matric"], course["code"], student["matric"]),
+                ),
+                (
+                    "UPDATE students SET total_credits = total_credits + ? WHERE matric = ?",
+                    (course["credit"], student["matric"]),
+                ),
+            ]
+        )
+        student["registered_courses"].append(course["code"])
+        student["total_credits"] += course["credit"]
+
+    def drop_course(self, student, course):
+        self.write(
+            [
+                (
+                    "DELETE FROM registrations WHERE matric = ? AND code = ?",
+                    (student["matric"], course["code"]),
+                ),
+                (
+                    "UPDATE students SET total_credits = total_credits - ? WHERE matric = ?",
+                    (course["credit"], student["matric"]),
+                ),
+            ]
+        )
+        student["registered_courses"].remove(course["code"])
+        student["total_credits"] -= course["credit"]
+
+    def set_credits(self, student, total):
+        self.write(
+            [
+                (
+                    "UPDATE students SET total_credits = ? WHERE matric = ?",
+                    (total, student["matric"]),
+                )
+            ]
+        )
+        student["total_credits"] = total
+
+    def join_waitlist(self, student, course):
+        self.write(
+            [
+                (
+                    "INSERT INTO waitlist VALUES (?, (SELECT COALESCE(MAX(position) + 1, 0)"
+                    " FROM waitlist WHERE code = ?), ?)",
+                    (course["code"], course["code"], student["matric"]),
+                )
+            ]
+        )
+
+    def leave_waitlist(self, student, course):
+        self.write(
+            [
+                (
+                    "DELETE FROM waitlist WHERE code = ? AND matric = ?",
+                    (course["code"], student["matric"]),
+                )
+            ]
+        )
+
+    def close(self):
+        with self.lock:
+            if self.conn is not None:
+                self.run_pending()
+                self.conn.commit()
+                self.conn.close()
+                self.conn = None
+
+
+# ==========================================
+# WRITE-BEHIND
+# ==========================================
+# puts a store in buffered mode and writes it from a background thread once
+# changes stop coming for WRITE_DELAY seconds, so a burst of clicks becomes one
+# write and the thread making the changes (the Tk main loop) never waits on disk
+class WriteBehind:
+    def __init__(self, store, delay=WRITE_DELAY, max_delay=MAX_WRITE_DELAY):
+        self.store = store
+        self.delay = delay
+        self.max_delay = max_delay
+        self.cond = threading.Condition()
+        self.due = None  # when the buffered changes get written; None: nothing buffered
+        self.first_change = None
+        self.closed = False
+        self.error = None  # last failed write, re-raised by close()
+        store.autoflush = False
+        store.on_change = self.changed
+        self.thread = threading.Thread(target=self.run, name="write-behind", daemon=True)
+        self.thread.start()
+
+    def changed(self):
+        with self.cond:
+            now = time.monotonic()
+            if self.first_change is None:
+                self.first_change = now
+            self.due = min(now + self.delay, self.first_change + self.max_delay)
+            self.cond.notify()
+
+    def flush_soon(self):
+        # write whatever is buffered now, still without waiting for it (logout)
+        with self.cond:
+            self.due = time.monotonic()
+            self.cond.notify()
+
+    def run(self):
+        while True:
+            with self.cond:
+                while not self.closed and (self.due is None or self.due > time.monotonic()):
+                    self.cond.wait(None if self.due is None else self.due - time.monotonic())
+                self.due = self.first_change = None
+                closed = self.closed
+            try:
+                self.store.flush()
+            except Exception as e:  # keep running; the next write retries everything pending
+                self.error = e
+            else:
+                self.error = None  # the retry got everything out, nothing left to report
+            if closed:
+                return
+
+    def close(self):
+        # final write, waited for (window close)
+        with self.cond:
+            self.closed = True
+            self.cond.notify()
+        self.thread.join()
+        self.store.on_change = None
+        self.store.autoflush = True
+        if self.error:
+            raise self.error
+
+
+# ==========================================
+# COURSE FILE WATCHER
+# ==========================================
+# lets a long-running process notice an edited courses.json: poll() is one stat()
+# call, and the file is only read again when its mtime or size moved
+class CourseWatcher:
+    def __init__(self, path=COURSES_FILE):
+        self.path = path
+        self.stamp = self.stat()  # taken before the catalog is read, so no edit slips by
+
+    def stat(self):
+        try:
+            info = os.stat(self.path)
+        except OSError:
+            return None
+        return (info.st_mtime_ns, info.st_size)
+
+    def poll(self):
+        # -> the new course list when the file changed since the last poll, else None
+        stamp = self.stat()
+        if stamp is None or stamp == self.stamp:
+            return None
+        try:
+            with open(self.path, "r") as f:
+                courses = json.load(f)
+        except (OSError, ValueError):
+            return None  # caught halfway through a save; the next poll reads it again
+        self.stamp = stamp
+        return courses if isinstance(courses, list) else None
+
+
+def open_store(engine=None, only=None):
+    # only: a matric, for one-shot commands that read a single student. the JSON
+    # engine then opens read-only (see JsonStore.load_one); sqlite reads lazily anyway
+    engine = engine or STORAGE_ENGINE
+    if engine == "sqlite":
+        store = SqliteStore()
+    elif engine == "json":
+        store = JsonStore()
+    else:
+        raise ValueError(f"Unknown storage engine: {engine}")
+    if only is not None and engine == "json":
+        store.load_one(only)
+    else:
+        store.load()
+    return store
+
+
+# python storage.py migrate -> (re)import students.json/courses.json into registration.db
+if __name__ == "__main__":
+    if sys.argv[1:2] != ["migrate"]:
+        print("Usage: python storage.py migrate")
+        sys.exit(1)
+    db = SqliteStore()
+    db.load()
+    db.migrate_json()
+    db.close()
+    print(f"Migrated {STUDENTS_FILE} and {COURSES_FILE} into {DATABASE_FILE}.")
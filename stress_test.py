@@ -0,0 +1,151 @@
+import json
+import os
+import random
+import sys
+import tempfile
+import threading
+
+from catalog import Catalog
+from registration import ENROLLED, Registry, RegistrationError
+from storage import open_store
+
+# many threads add/drop a handful of small courses at once, then every seat count
+# and waitlist is checked against the capacities, in memory and after a reload.
+# the store is buffered and flushed from its own thread, as in the server, and the
+# JSON journal is compacted every few records while the threads run; the reload
+# happens before close(), so a torn compaction would show up as a wrong total
+# python stress_test.py [json|sqlite]
+
+HERE = os.path.dirname(os.path.abspath(__file__))  # resolved before the chdir below
+THREADS = 32
+STUDENTS = 80
+CAPACITY = 30
+ROUNDS = 100
+COMPACT_EVERY = 5  # journal records between compactions (JSON)
+COURSES = [
+    # no two share a slot, so only seats and the credit limits decide an add / drop
+    {
+        "code": f"STRS{i:04d}",
+        "name": f"STRESS COURSE {i}",
+        "credit": 3,
+        "slots": [[day, f"{8 + i // 5:02d}:00-{9 + i // 5:02d}:00"]],
+        "location": "Hall",
+        "capacity": CAPACITY,
+    }
+    for i, day in enumerate(["Monday", "Tuesday", "Wednesday", "Thursday", "Friday"] * 2)
+]
+
+
+def check(registry, label):
+    problems = []
+    enrolled = {}
+    for student in registry.store.iter_students():
+        for code in student["registered_courses"]:
+            enrolled[code] = enrolled.get(code, 0) + 1
+        codes = student["registered_courses"]
+        credits = sum(registry.catalog.get(code)["credit"] for code in codes)
+        if student["total_credits"] != credits:
+            problems.append(
+                f"{student['matric']}: total_credits {student['total_credits']}, "
+                f"courses add up to {credits}"
+            )
+    waitlists = registry.store.waitlists()
+    for course in COURSES:
+        code = course["code"]
+        seats = registry.seats_of(code)
+        if enrolled.get(code, 0) > CAPACITY:
+            problems.append(f"{code}: {enrolled[code]} enrolled, capacity {CAPACITY}")
+        if seats.taken != enrolled.get(code, 0):
+            problems.append(f"{code}: counter {seats.taken}, store {enrolled.get(code, 0)}")
+        if list(seats.waiting) != waitlists.get(code, []):
+            problems.append(f"{code}: waitlist in memory differs from the store")
+        if seats.waiting and seats.free():
+            problems.append(f"{code}: free seat while {len(seats.waiting)} are waiting")
+        print(
+            f"{label} {code}: {enrolled.get(code, 0)}/{CAPACITY} enrolled, "
+            f"{len(seats.waiting)} waiting"
+        )
+    return problems
+
+
+def worker(registry, matrics, seed, results):
+    rng = random.Random(seed)
+    catalog = registry.catalog
+    for _ in range(ROUNDS):
+        session = registry.login(rng.choice(matrics))
+        course = catalog.get(rng.choice(COURSES)["code"])
+        try:
+            if rng.random() < 0.7:
+                results.append(session.add(course))
+            else:
+                session.drop(course)
+                results.append("dropped")
+        except RegistrationError:
+            results.append("refused")
+
+
+def load_catalog():
+    with open("courses.json") as f:
+        return Catalog(json.load(f))
+
+
+def flusher(registry, stop):
+    while not stop.wait(0.001):
+        registry.flush()
+
+
+def run(engine):
+    store = open_store(engine)
+    store.compact_every = COMPACT_EVERY
+    store.autoflush = False
+    registry = Registry(store, load_catalog())
+    matrics = [f"A25AI{n:04d}" for n in range(STUDENTS)]
+    for matric in matrics:
+        registry.register("Stress Student", matric)
+
+    results = []
+    sys.setswitchinterval(1e-6)  # switch threads often, so narrow interleavings happen
+    stop = threading.Event()
+    saver = threading.Thread(target=flusher, args=(registry, stop))
+    threads = [
+        threading.Thread(target=worker, args=(registry, matrics, seed, results))
+        for seed in range(THREADS)
+    ]
+    saver.start()
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    stop.set()
+    saver.join()
+    sys.setswitchinterval(0.005)
+    registry.flush()
+    print(
+        f"{len(results)} requests: {results.count(ENROLLED)} enrolled, "
+        f"{results.count('waitlisted')} waitlisted, {results.count('dropped')} dropped, "
+        f"{results.count('refused')} refused"
+    )
+    problems = check(registry, "live")
+
+    # read back what is on disk as it stands, as after a crash: no closing compaction
+    reloaded = Registry(open_store(engine), load_catalog())
+    problems += check(reloaded, "reloaded")
+    reloaded.close()
+    registry.close()
+    return problems
+
+
+if __name__ == "__main__":
+    engine = sys.argv[1] if len(sys.argv) > 1 else "json"
+    with tempfile.TemporaryDirectory() as tmp:
+        os.chdir(tmp)  # the stores use their default file names
+        with open("courses.json", "w") as f:
+            json.dump(COURSES, f)
+        with open("students.json", "w") as f:
+            json.dump([], f)
+        problems = run(engine)
+        os.chdir(HERE)  # out of tmp, so it can be deleted
+    for problem in problems:
+        print("FAIL", problem)
+    print("OK: no course overbooked" if not problems else f"{len(problems)} problems")
+    sys.exit(1 if problems else 0)
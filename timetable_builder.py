@@ -1,49 +1,93 @@
-from tabulate import tabulate
-import json
-import re
+from profiling import STARTUP  # first, so the startup clock covers the imports below
+import argparse
+import sys
+from collections import OrderedDict
+from catalog import Catalog
+from metrics import METRICS, timed
+from registration import WAITLISTED, Registry, RegistrationError, Session
+from rules import MAX_CREDITS, MIN_CREDITS, check_student, matric_error, name_error
+from slots import DAYS
+from solver import best_timetables, timetable_score
+from storage import CourseWatcher, open_store
+
+STARTUP.mark("imports")
 
 # ==========================================
 # DATA (Global)
 # ==========================================
-students = []
-courses_available = []
-current_student = None  # Tracks the logged-in student
+registry = None  # Registry over the store (see storage.open_store()) and catalog
+catalog = None  # Catalog built from courses.json
+current_session = None  # Session of the logged-in student
+current_student = None  # Tracks the logged-in student (current_session.student)
+watcher = None  # notices edits to courses.json while the menu is running
+
+
+def tabulate(*args, **kwargs):
+    # imported on first use, so one-shot commands that never draw a table skip it
+    from tabulate import tabulate as render
+
+    return render(*args, **kwargs)
+
+
+# ==========================================
+# RENDER CACHE
+# ==========================================
+# rendered tables, least recently used dropped first. keys carry catalog.version
+# and the student's registration version (registry.version_of), so an add/drop
+# makes old entries unreachable; invalidate() frees them straight away
+RENDER_CACHE_SIZE = 64
+
+
+class RenderCache:
+    def __init__(self, size=RENDER_CACHE_SIZE):
+        self.size = size
+        self.entries = OrderedDict()
+
+    def get(self, key, render):
+        text = self.entries.get(key)
+        if text is None:
+            text = self.entries[key] = render()
+            if len(self.entries) > self.size:
+                self.entries.popitem(last=False)
+        else:
+            self.entries.move_to_end(key)
+        return text
+
+    def invalidate(self, matric):
+        for key in [k for k in self.entries if k[2] == matric]:
+            del self.entries[key]
+
+
+render_cache = RenderCache()
+
+
+def cached_table(kind, render, matric=None):
+    # kind names the table; matric=None for tables that don't depend on a student
+    version = registry.version_of(matric) if matric else None
+    return render_cache.get((kind, catalog.version, matric, version), render)
+
+
+def course_table(courses):
+    return tabulate(courses, headers="keys", tablefmt="fancy_grid")
 
 
 # ==========================================
 # VALIDATION FUNCTIONS
 # ==========================================
 def validate_name(name):
-    name = name.strip()
-    if len(name) < 4:
-        print("Error: Name is too short (minimum 4 characters).")
-        return False
-    if len(name.split()) < 2:
-        print("Error: Please enter at least two words (e.g., First Last).")
-        return False
-    if any(char.isdigit() for char in name):
-        print("Error: Name cannot contain numbers.")
-        return False
-    if not re.match(r"^[a-zA-Z\s\-\']+$", name):
-        print(
-            "Error: Name contains invalid characters. Only letters, spaces, hyphens, and apostrophes allowed."
-        )
+    error = name_error(name)
+    if error:
+        print(f"Error: {error}")
         return False
     return True
 
 
 def validate_matric(matric):
-    matric = matric.strip().upper()
-    if len(matric) != 9:
-        print("Error: Matric number must be exactly 9 characters long.")
+    error = matric_error(matric)
+    if error:
+        print(f"Error: {error}")
         return False
-    if not matric.startswith("A25AI"):
-        print("Error: Matric number must start with 'A25AI'.")
-        return False
-    if not matric[5:].isdigit():
-        print("Error: Last 4 digits of matric number must be numeric.")
-        return False
-    return matric
+    return matric.strip().upper()
 
 
 # ==========================================
@@ -65,22 +109,19 @@ def display_menu():
     print("4. Drop Course")
     print("5. View Registered Courses")
     print("6. Generate Timetable")
-    print("7. Log Out")
-    print("8. Save & Exit")
+    print("7. Auto-Build Timetable")
+    print("8. Log Out")
+    print("9. Save & Exit")
     print("-" * 70)
 
 
-def check_credit_limit(current_credits, new_credit):
-    if current_credits + new_credit > 21:
-        print(
-            f"Error: Cannot add! Exceeds 21 credits ({current_credits} + {new_credit} = {current_credits + new_credit})"
-        )
-        return False
-    return True
+def start_session(session):
+    global current_session, current_student
+    current_session = session
+    current_student = session.student if session else None
 
 
 def register_student():
-    global current_student
     print("\n--- NEW STUDENT REGISTRATION ---")
     while True:
         name = input("Enter Full Name: ").title()
@@ -92,30 +133,25 @@ def register_student():
         if matric:
             break
 
-    if any(s["matric"] == matric for s in students):
-        print("Error: This matric number is already registered!")
+    try:
+        session = registry.register(name, matric)
+    except RegistrationError as e:
+        print(f"Error: {e}")
         return
-
-    new_student = {
-        "name": name,
-        "matric": matric,
-        "registered_courses": [],
-        "total_credits": 0,
-    }
-    students.append(new_student)
-    current_student = new_student  # Auto login after registration
+    start_session(session)  # Auto login after registration
     print(f"\nStudent {name} ({matric}) registered and logged in successfully!")
-    print("\nYou must register for at least 12 credits.")
-    while current_student["total_credits"] < 12:
-        print(f"\nCurrent credits: {current_student['total_credits']}/12 required")
+    print(f"\nYou must register for at least {MIN_CREDITS} credits.")
+    while current_student["total_credits"] < MIN_CREDITS:
+        print(
+            f"\nCurrent credits: {current_student['total_credits']}/{MIN_CREDITS} required"
+        )
         add_course()
-        if current_student["total_credits"] >= 12:
+        if current_student["total_credits"] >= MIN_CREDITS:
             print("\nMinimum credit requirement met!")
 
 
 def login():
-    global current_student
-    if current_student:
+    if current_session:
         print("You are already logged in!")
         return
 
@@ -124,21 +160,21 @@ def login():
     if not validated_matric:
         return
 
-    student = next((s for s in students if s["matric"] == validated_matric), None)
-    if student:
-        current_student = student
-        print(f"Login successful! Welcome back, {student['name']}.")
-    else:
-        print("Student not found. Please register first.")
+    try:
+        start_session(registry.login(validated_matric))
+    except RegistrationError as e:
+        print(e)
+        return
+    print(f"Login successful! Welcome back, {current_student['name']}.")
+    show_notices()
 
 
 def logout():
-    global current_student
-    if not current_student:
+    if not current_session:
         print("No one is logged in.")
         return
     print(f"Logged out from {current_student['name']}.")
-    current_student = None
+    start_session(None)
 
 
 def require_login():
@@ -148,29 +184,17 @@ def require_login():
     return True
 
 
+@timed("cli_find_course")
 def find_course_by_partial_code(partial_code):
     partial_code = partial_code.strip().upper()
-    matches = []
-
-    for course in courses_available:
-        code = course["code"]
-        name = course["name"].upper()
 
-        # Exact code match = immediate return (highest priority)
-        if code == partial_code:
-            return course
+    # Exact code match or SAIA 4-digit shortcut (highest priority)
+    course = catalog.lookup(partial_code)
+    if course:
+        return course
 
-        # SAIA 4-digit shortcut
-        if (
-            len(partial_code) == 4
-            and partial_code.isdigit()
-            and code == "SAIA" + partial_code
-        ):
-            return course
-
-        # Partial match in code OR course name
-        if partial_code in code or partial_code in name:
-            matches.append(course)
+    # Partial match in code OR course name
+    matches = catalog.search(partial_code)
 
     if len(matches) == 0:
         return None
@@ -179,41 +203,25 @@ def find_course_by_partial_code(partial_code):
     else:
         # multiple matches, show them and ask user to choose or confirm
         print("\nMultiple courses found matching your input:")
-        print(tabulate(matches, headers="keys", tablefmt="fancy_grid"))
+        print(cached_table(("search", partial_code), lambda: course_table(matches)))
         print("\nPlease enter the exact course code from the list above.")
         return None  # force user to re-enter a more specific or full code
 
 
-def detect_clash(new_course):
-    for n_slot in new_course["slots"]:
-        n_day, n_time = n_slot
-        n_start_str, n_end_str = n_time.split("-")
-        n_start = int(n_start_str.split(":")[0])
-        n_end = int(n_end_str.split(":")[0])
-
-        for reg_course in current_student["registered_courses"]:
-            for r_slot in reg_course["slots"]:
-                r_day, r_time = r_slot
-                if n_day != r_day:
-                    continue
-                r_start_str, r_end_str = r_time.split("-")
-                r_start = int(r_start_str.split(":")[0])
-                r_end = int(r_end_str.split(":")[0])
-
-                if max(n_start, r_start) < min(n_end, r_end):
-                    print(
-                        f"CLASH ALERT: Conflicts with {reg_course['code']} ({reg_course['name']}) on {n_day} {r_time}"
-                    )
-                    return True
-    return False
-
-
 def add_course():
     if not require_login():
         return
 
-    print("\nAvailable Courses:")
-    print(tabulate(courses_available, headers="keys", tablefmt="fancy_grid"))
+    def render_fitting():
+        fitting = catalog.fitting(
+            current_student["registered_courses"],
+            credit_room=MAX_CREDITS - current_student["total_credits"],
+        )
+        if not fitting:
+            return "\nNo remaining course fits your current timetable and credit limit."
+        return "\nAvailable Courses (no clash, within your credit limit):\n" + course_table(fitting)
+
+    print(cached_table("fitting", render_fitting, current_student["matric"]))
     print("\nTip: Enter just the number (e.g., 1113 for SAIA1113, 1032 for ULRS1032)")
 
     code_input = input("\nEnter course code to add: ").strip()
@@ -225,21 +233,18 @@ def add_course():
 
     print(f"Found: {course['code']} - {course['name']}")
 
-    if course in current_student["registered_courses"]:
-        print("Error: Already registered for this course!")
-        return
-
-    if not check_credit_limit(current_student["total_credits"], course["credit"]):
+    try:
+        status = current_session.add(course)
+    except RegistrationError as e:
+        print(f"Error: {e}")
         return
-
-    if detect_clash(course):
-        print(f"Cannot add {course['code']} due to clash.")
+    render_cache.invalidate(current_student["matric"])
+    if status == WAITLISTED:
+        position = dict((c["code"], n) for c, n in current_session.waitlist())[course["code"]]
+        print(f"{course['code']} is full. You are #{position} on its waitlist.")
         return
-
-    current_student["registered_courses"].append(course)
-    current_student["total_credits"] += course["credit"]
     print(f"Course {course['code']} added successfully!")
-    print(f"Total credits: {current_student['total_credits']}/21")
+    print(f"Total credits: {current_student['total_credits']}/{MAX_CREDITS}")
 
 
 def drop_course():
@@ -251,11 +256,7 @@ def drop_course():
         return
 
     print("\nYour Registered Courses:")
-    print(
-        tabulate(
-            current_student["registered_courses"], headers="keys", tablefmt="fancy_grid"
-        )
-    )
+    print(registered_table())
     print("\nTip: Enter just the number or full code")
 
     code_input = input("\nEnter course code to drop: ").strip()
@@ -265,18 +266,27 @@ def drop_course():
         print("Error: Course not found!")
         return
 
-    if course not in current_student["registered_courses"]:
-        print("Error: You are not registered for this course!")
+    waitlisted = course["code"] not in current_student["registered_courses"]
+    try:
+        current_session.drop(course)
+    except RegistrationError as e:
+        print(f"Error: {e}")
         return
-
-    if current_student["total_credits"] - course["credit"] < 12:
-        print("Cannot drop! Would fall below minimum 12 credits.")
+    render_cache.invalidate(current_student["matric"])
+    if waitlisted:
+        print(f"Left the waitlist for {course['code']}.")
         return
-
-    current_student["registered_courses"].remove(course)
-    current_student["total_credits"] -= course["credit"]
     print(f"Course {course['code']} dropped successfully!")
-    print(f"Total credits: {current_student['total_credits']}/21")
+    print(f"Total credits: {current_student['total_credits']}/{MAX_CREDITS}")
+
+
+def registered_table():
+    # shared by view and drop
+    return cached_table(
+        "registered",
+        lambda: course_table(catalog.resolve(current_student["registered_courses"])),
+        current_student["matric"],
+    )
 
 
 def view_registered_courses():
@@ -289,65 +299,131 @@ def view_registered_courses():
     if not current_student["registered_courses"]:
         print("No courses registered yet.")
     else:
-        print(
-            tabulate(
-                current_student["registered_courses"],
-                headers="keys",
-                tablefmt="fancy_grid",
-            )
-        )
-    print(f"Total Credits: {current_student['total_credits']}/21")
+        print(registered_table())
+    print(f"Total Credits: {current_student['total_credits']}/{MAX_CREDITS}")
+    for course, position in current_session.waitlist():
+        print(f"Waitlisted: {course['code']} - {course['name']} (#{position} in line)")
 
 
+@timed("cli_generate_timetable")
 def generate_timetable():
     if not require_login():
         return
 
-    days = ["Monday", "Tuesday", "Wednesday", "Thursday", "Friday"]
-    timetable = {day: {f"{h:02d}:00": "---" for h in range(8, 17)} for day in days}
-
-    for course in current_student["registered_courses"]:
-        for slot in course["slots"]:
-            day, time_range = slot
-            if day not in days:
-                continue
-            start_str, end_str = time_range.split("-")
-            start_h = int(start_str.split(":")[0])
-            end_h = int(end_str.split(":")[0])
-            for h in range(start_h, end_h):
-                timetable[day][f"{h:02d}:00"] = course["code"]
-
-    table_data = []
-    headers = ["Day"] + [f"{h:02d}:00" for h in range(8, 17)]
-    for day in days:
-        row = [day] + [timetable[day][f"{h:02d}:00"] for h in range(8, 17)]
-        table_data.append(row)
+    def render_timetable():
+        hours = range(8, 17)
+        timetable = current_session.timetable(DAYS[:5], hours)
+
+        table_data = []
+        headers = ["Day"] + [f"{h:02d}:00" for h in hours]
+        for day, cells in timetable.items():
+            table_data.append([day] + [code or "---" for code in cells])
+        return tabulate(table_data, headers=headers, tablefmt="fancy_grid")
 
     print(f"\nTimetable for {current_student['name']} ({current_student['matric']}):")
-    print(tabulate(table_data, headers=headers, tablefmt="fancy_grid"))
+    print(cached_table("timetable", render_timetable, current_student["matric"]))
+
+
+def auto_build_timetable():
+    if not require_login():
+        return
 
+    print("\n--- AUTO-BUILD TIMETABLE ---")
+    required = []
+    if current_student["registered_courses"]:
+        keep = input("Keep your currently registered courses? (y/n): ").strip().lower()
+        if keep != "n":
+            required = list(current_student["registered_courses"])
+    extra = input("Other courses you must take (comma-separated, blank for none): ")
+    for part in extra.split(","):
+        if not part.strip():
+            continue
+        course = find_course_by_partial_code(part)
+        if not course:
+            print(f"Error: Course '{part.strip()}' not found!")
+            return
+        required.append(course["code"])
+
+    options = best_timetables(catalog, required)
+    if not options:
+        print(
+            f"No clash-free timetable of {MIN_CREDITS}-{MAX_CREDITS} credits includes those courses."
+        )
+        return
 
+    rows = []
+    for n, codes in enumerate(options, start=1):
+        credits, days, _ = timetable_score(catalog, codes)
+        rows.append([n, ", ".join(codes), credits, -days])
+    print(
+        tabulate(
+            rows, headers=["Option", "Courses", "Credits", "Days"], tablefmt="fancy_grid"
+        )
+    )
+
+    choice = input("\nPick an option to apply (blank to cancel): ").strip()
+    if not choice:
+        return
+    if not choice.isdigit() or not 1 <= int(choice) <= len(options):
+        print("Invalid option.")
+        return
+    try:
+        current_session.apply_timetable(options[int(choice) - 1])
+    except RegistrationError as e:
+        print(f"Error: {e}")
+        return
+    render_cache.invalidate(current_student["matric"])
+    print("Timetable applied!")
+    print(f"Total credits: {current_student['total_credits']}/{MAX_CREDITS}")
+
+
+def show_notices():
+    # catalog changes that touched the logged-in student, each shown once
+    if current_session:
+        for notice in current_session.take_notices():
+            print(f"Notice: {notice}")
+
+
+def check_catalog():
+    # between menu choices: one stat() of courses.json, and only on a change is it
+    # read and diffed into the running catalog
+    courses = watcher.poll()
+    if courses is None:
+        return
+    try:
+        (added, removed, changed), notices = registry.reload_catalog(courses)
+    except (KeyError, TypeError, ValueError) as e:
+        print(f"\nWarning: courses.json changed but could not be loaded ({e}).")
+        print("Keeping the old catalog.")
+        return
+    if added or removed or changed:
+        print(
+            f"\nCourse catalog updated: {len(added)} added, {len(removed)} removed, "
+            f"{len(changed)} changed ({len(notices)} student(s) affected)."
+        )
+    show_notices()
+
+
+@timed("cli_save_data")
 def save_and_exit():
-    with open("students.json", "w") as f:
-        json.dump(students, f, indent=4)
+    registry.close()
     print("Data saved successfully. Goodbye!")
 
 
+@timed("cli_load_data")
 def load_data():
-    global students, courses_available
-    try:
-        with open("students.json", "r") as f:
-            students = json.load(f)
-    except FileNotFoundError:
-        print("No existing student data found. Starting fresh.")
-        students = []
+    global registry, catalog, watcher
+    store = open_store()
+    watcher = CourseWatcher(store.courses_path)  # before the read, so no edit slips by
 
     try:
-        with open("courses.json", "r") as f:
-            courses_available = json.load(f)
+        catalog = Catalog(store.courses())
     except FileNotFoundError:
+        catalog = Catalog([])
+    if not catalog:
         print("Error: courses.json not found! Please ensure it exists.")
         exit()
+    registry = Registry(store, catalog)
 
 
 # ==========================================
@@ -355,11 +431,14 @@ def load_data():
 # ==========================================
 def main():
     load_data()
+    STARTUP.mark("load data")
+    STARTUP.report()
     print("Welcome to UTM AI Student Course Registration System")
 
     while True:
+        check_catalog()
         display_menu()
-        choice = input("Select an option (1-8): ").strip()
+        choice = input("Select an option (1-9): ").strip()
 
         if choice == "1":
             register_student()
@@ -374,13 +453,113 @@ def main():
         elif choice == "6":
             generate_timetable()
         elif choice == "7":
-            logout()
+            auto_build_timetable()
         elif choice == "8":
+            logout()
+        elif choice == "9":
             save_and_exit()
             break
         else:
             print("Invalid option. Please try again.")
 
 
+# ==========================================
+# ONE-SHOT COMMANDS (kiosk scripts)
+# ==========================================
+# e.g. python timetable_builder.py check A25AI1234
+# these read the one student asked for (with the JSON engine: that record and its
+# journal lines only, see JsonStore.load_one) and only the courses it touches
+def load_student(matric):
+    global registry, catalog
+    store = open_store(only=matric)
+    STARTUP.mark("open store")
+    student = store.get_student(matric)
+    STARTUP.mark("load student")
+    if student is None:
+        store.close()
+        return None
+    waiting = [code for code, queue in store.waitlists().items() if matric in queue]
+    catalog = Catalog(store.courses(student["registered_courses"] + waiting))
+    registry = Registry(store, catalog)
+    start_session(Session(registry, student))
+    STARTUP.mark("load courses")
+    return student
+
+
+def check_command(matric):
+    student = load_student(matric)
+    if not student:
+        print(f"Student {matric} not found.")
+        return 2
+    print(
+        f"{student['name']} ({student['matric']}): {student['total_credits']} credits, "
+        f"{len(student['registered_courses'])} courses"
+    )
+    problems = check_student(student, catalog)
+    for problem in problems:
+        print(f"  - {problem}")
+    if problems:
+        return 1
+    print("OK")
+    return 0
+
+
+def view_command(matric):
+    if not load_student(matric):
+        print(f"Student {matric} not found.")
+        return 2
+    view_registered_courses()
+    return 0
+
+
+def timetable_command(matric):
+    if not load_student(matric):
+        print(f"Student {matric} not found.")
+        return 2
+    generate_timetable()
+    return 0
+
+
+COMMANDS = {
+    "check": (check_command, "validate a student's registration (exit 1 on problems)"),
+    "view": (view_command, "list a student's registered courses"),
+    "timetable": (timetable_command, "print a student's weekly timetable"),
+}
+
+
+def run(argv):
+    parser = argparse.ArgumentParser(
+        prog="timetable_builder",
+        description="Student course registration. Without a command, opens the menu.",
+    )
+    parser.add_argument(
+        "--profile-startup",
+        action="store_true",
+        help="print import and load timings to stderr",
+    )
+    subparsers = parser.add_subparsers(dest="command")
+    for name, (_, help_text) in COMMANDS.items():
+        command = subparsers.add_parser(name, help=help_text)
+        command.add_argument("matric")
+        command.add_argument(
+            "--profile-startup", action="store_true", default=argparse.SUPPRESS
+        )
+    args = parser.parse_args(argv)
+    METRICS.start()
+
+    if args.command is None:
+        main()
+        return 0
+    matric = validate_matric(args.matric)
+    if not matric:
+        return 2
+    status = COMMANDS[args.command][0](matric)
+    if registry is not None:
+        registry.close()
+    STARTUP.mark(args.command)
+    STARTUP.report()
+    return status
+
+
 if __name__ == "__main__":
-    main()
+    sys.exit(run(sys.argv[1:]))
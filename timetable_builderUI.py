@@ -1,27 +1,31 @@
+from profiling import STARTUP  # first, so the startup clock covers the imports below
 import customtkinter as ctk
 import json
 import os
-import re
+from tkinter import messagebox
 from PIL import Image, ImageDraw
+from catalog import Catalog
+from colors import COURSE_COLORS
+from metrics import METRICS, timed
+from registration import WAITLISTED, Registry, RegistrationError
+from rules import MAX_CREDITS, MIN_CREDITS, matric_error, name_error
+from solver import best_timetables, timetable_score
+from widgets import TimetableCanvas, VirtualCourseList
+from slots import DAYS
+from storage import CourseWatcher, WriteBehind, open_store
+
+STARTUP.mark("imports")
 
 # CONFIGURATION & THEME
 ctk.set_appearance_mode("Light")
 ctk.set_default_color_theme("green")
 
 APP_NAME = "UTM AI: Student Scheduler"
-MAX_CREDITS = 21
-MIN_CREDITS = 12
-
-COURSE_COLORS = [
-    "#A7C7E7",  # Soft Sky Blue
-    "#B5EAD7",  # Mint Green
-    "#E0BBE4",  # Lavender Purple
-    "#FFC3A0",  # Peach Orange
-    "#C7CEEA",  # Periwinkle
-    "#FFDAC1",  # Light Coral
-    "#E2F0CB",  # Pale Lime
-    "#D4A5A5",  # Dusty Rose
-]
+LOGO_FILE = "utm_logo.png"
+LOGO_SIZE = (180, 60)
+# pre-scaled copy of the logo (2x for HiDPI), so launch doesn't decode the full PNG
+LOGO_CACHE = os.path.join(".cache", "utm_logo_360x120.png")
+CATALOG_POLL_MS = 2000  # how often courses.json is checked for edits (one stat() call)
 
 
 # DATA HANDLING
@@ -102,47 +106,144 @@ class GROUP2App(ctk.CTk):
         super().__init__()
         self.title(APP_NAME)
         self.geometry("1280x800")
-        self.students = []
-        self.courses_available = []
+        self.registry = None  # built on the first login / register, see ensure_data
+        self.saver = None  # writes add/drop to disk off the main loop
+        self.watcher = None  # picks up edits to courses.json, see check_catalog
+        self.catalog_poll = None  # after() id of the next check_catalog
+        self.toast_timer = None  # after() id that hides the current toast
+        self.session = None
+        self.catalog = Catalog([])
         self.current_student = None
         self.notification_label = None
         self.timetable_container = None
         self.min_credit_warning = None
-        create_initial_data()
-        self.load_data()
+        STARTUP.mark("window")
+        # student and course data are loaded on the first login / register, not here
         self.logo_image = self.get_logo_image()
+        STARTUP.mark("logo")
         self.grid_columnconfigure(1, weight=1)
         self.grid_rowconfigure(0, weight=1)
+        self.protocol("WM_DELETE_WINDOW", self.on_close)
         self.show_login_screen()
+        STARTUP.mark("login screen")
+        self.after_idle(self.first_frame_shown)
+
+    def first_frame_shown(self):
+        STARTUP.mark("first frame")
+        STARTUP.report()
 
     def get_logo_image(self):
         try:
-            img = Image.open("utm_logo.png")
-            return ctk.CTkImage(light_image=img, dark_image=img, size=(180, 60))
+            img = Image.open(self.cached_logo_path())
+            return ctk.CTkImage(light_image=img, dark_image=img, size=LOGO_SIZE)
         except Exception:
             img = Image.new(
-                "RGB", (180, 60), color=(200, 240, 220)
+                "RGB", LOGO_SIZE, color=(200, 240, 220)
             )
             d = ImageDraw.Draw(img)
             d.text((25, 15), "UTM AI", fill="#2E8B57", font_size=28)  # Sea green text
-            return ctk.CTkImage(light_image=img, dark_image=img, size=(180, 60))
-
+            return ctk.CTkImage(light_image=img, dark_image=img, size=LOGO_SIZE)
+
+    def cached_logo_path(self):
+        # rebuilt only when utm_logo.png is newer than the cached copy
+        if os.path.exists(LOGO_CACHE) and os.path.getmtime(LOGO_CACHE) >= os.path.getmtime(
+            LOGO_FILE
+        ):
+            return LOGO_CACHE
+        img = Image.open(LOGO_FILE)
+        img = img.resize((LOGO_SIZE[0] * 2, LOGO_SIZE[1] * 2), Image.LANCZOS)
+        try:
+            os.makedirs(os.path.dirname(LOGO_CACHE), exist_ok=True)
+            img.save(LOGO_CACHE, optimize=True)
+        except OSError:
+            return LOGO_FILE  # read-only install: fall back to scaling the original
+        return LOGO_CACHE
+
+    def ensure_data(self):
+        if self.registry is None:
+            create_initial_data()
+            self.load_data()
+
+    @timed("gui_load_data")
     def load_data(self):
+        store = open_store()
+        self.watcher = CourseWatcher(store.courses_path)  # before the read, so no edit slips by
         try:
-            with open("students.json", "r") as f:
-                self.students = json.load(f)
-            with open("courses.json", "r") as f:
-                self.courses_available = json.load(f)
+            self.catalog = Catalog(store.courses())
         except:
-            self.students, self.courses_available = [], []
+            self.catalog = Catalog([])
+        self.registry = Registry(store, self.catalog)
+        self.saver = WriteBehind(store)
+        self.catalog_poll = self.after(CATALOG_POLL_MS, self.check_catalog)
+
+    def check_catalog(self):
+        try:
+            courses = self.watcher.poll()
+            if courses is not None:
+                try:
+                    (added, removed, changed), _ = self.registry.reload_catalog(courses)
+                except (KeyError, TypeError, ValueError):
+                    self.show_toast(
+                        "courses.json has errors - keeping the old catalog", is_error=True
+                    )
+                else:
+                    if added or removed or changed:
+                        self.catalog_changed(removed + changed)
+        finally:
+            # re-armed whatever happened above, or the catalog is never checked again
+            self.catalog_poll = self.after(CATALOG_POLL_MS, self.check_catalog)
+
+    def catalog_changed(self, codes):
+        # registration cards of edited courses still show the old name / credits
+        if self.current_student is None:
+            return
+        for code in codes:
+            card = self.reg_cards.pop(code, None)
+            if card is not None:
+                card[0].destroy()
+            if code in self.reg_shown:
+                self.reg_shown.remove(code)
+        self.refresh_ui()
+        if not self.show_notices():
+            self.show_toast("The course catalog was updated.", is_error=False)
+
+    def show_notices(self):
+        # catalog changes that touched the logged-in student; False when there are none
+        notices = self.session.take_notices()
+        if notices:
+            self.show_toast("\n".join(notices), is_error=True)
+        return bool(notices)
 
+    @timed("gui_save_data")
     def save_data(self):
-        with open("students.json", "w") as f:
-            json.dump(self.students, f, indent=4)
+        try:
+            self.saver.close()  # waits for the last buffered changes
+        finally:
+            self.registry.close()
+
+    def cancel_timers(self):
+        # pending after() callbacks would otherwise fire on a destroyed window
+        for timer in (self.catalog_poll, self.toast_timer):
+            if timer is not None:
+                self.after_cancel(timer)
+        self.catalog_poll = self.toast_timer = None
+
+    def on_close(self):
+        self.cancel_timers()
+        try:
+            if self.registry is not None:
+                self.withdraw()  # the window goes away at once, the final write finishes behind it
+                self.save_data()  # fold the journal back into students.json on the way out
+        except Exception as e:
+            messagebox.showerror("Save failed", f"Your last changes could not be saved:\n{e}")
+        finally:
+            self.destroy()  # always, or a hidden window keeps the process alive
 
     def show_toast(self, message, is_error=False):
         if self.notification_label:
             self.notification_label.destroy()
+        if self.toast_timer is not None:
+            self.after_cancel(self.toast_timer)  # its 3 seconds were for the old toast
         color = "#e74c3c" if is_error else "#27ae60"  # red for error, green for success
         self.notification_label = ctk.CTkLabel(
             self,
@@ -155,12 +256,13 @@ class GROUP2App(ctk.CTk):
             padx=20,
         )
         self.notification_label.place(relx=0.5, rely=0.95, anchor="center")
-        self.after(
-            3000,
-            lambda: (
-                self.notification_label.destroy() if self.notification_label else None
-            ),
-        )
+        self.toast_timer = self.after(3000, self.hide_toast)
+
+    def hide_toast(self):
+        self.toast_timer = None
+        if self.notification_label:
+            self.notification_label.destroy()
+            self.notification_label = None
 
     def clear_screen(self):
         for widget in self.winfo_children():
@@ -170,39 +272,17 @@ class GROUP2App(ctk.CTk):
     # VALIDATION FUNCTIONS
     def validate_name(self, name):
         name = name.strip() # input sanitization, because user might put space before their name
-        if len(name) < 4:
-            self.show_toast("Name too short (minimum 4 characters).", is_error=True)
-            return False
-        if len(name.split()) < 2:
-            self.show_toast(
-                "Please enter at least two words (e.g., First Last).", is_error=True
-            )
-            return False
-        if any(char.isdigit() for char in name):
-            self.show_toast("Name cannot contain numbers.", is_error=True)
-            return False
-        if not re.match(r"^[a-zA-Z\s\-\']+$", name): # line checks if name variable contains only allowed chars
-            self.show_toast(
-                "Invalid characters in name. Only letters, spaces, hyphens, and apostrophes allowed.",
-                is_error=True,
-            )
+        error = name_error(name) # shared rules, see rules.py
+        if error:
+            self.show_toast(error, is_error=True)
             return False
         return name.title()
 
     def validate_matric(self, matric_raw):
         matric = matric_raw.strip().upper()
-        if len(matric) != 9:
-            self.show_toast("Matric must be exactly 9 characters.", is_error=True)
-            return False
-        if not matric.startswith("A25AI"):
-            self.show_toast("Matric must start with 'A25AI'.", is_error=True)
-            return False
-        if not matric[5:].isdigit():
-            self.show_toast("Last 4 digits must be numeric.", is_error=True)
-            return False
-        if any(s["matric"] == matric for s in self.students): # loops through every student currently saved in list, 
-            # s["matric"] == matric: compares saved student matric with new one that student tries to register
-            self.show_toast("This matric number is already registered.", is_error=True)
+        error = matric_error(matric)
+        if error:
+            self.show_toast(error, is_error=True)
             return False
         return matric
 
@@ -266,7 +346,7 @@ class GROUP2App(ctk.CTk):
 
         self.min_credit_warning = ctk.CTkLabel(
             sidebar,
-            text="MINIMUM 12 CREDITS REQUIRED.",
+            text=f"MINIMUM {MIN_CREDITS} CREDITS REQUIRED.",
             text_color="#E67E22",
             font=("Roboto", 14, "bold"),
         )
@@ -283,6 +363,11 @@ class GROUP2App(ctk.CTk):
             border_width=2,
             command=self.logout,
         ).pack(side="bottom", pady=40, padx=40, fill="x")
+        ctk.CTkButton(
+            sidebar,
+            text="Auto-Build Timetable",
+            command=self.show_timetable_suggestions,
+        ).pack(side="bottom", padx=40, fill="x")
 
         main_view = ctk.CTkTabview(self)
         main_view.grid(row=0, column=1, padx=20, pady=20, sticky="nsew")
@@ -294,16 +379,19 @@ class GROUP2App(ctk.CTk):
 
     # LOGIC
     def handle_login(self):
-        matric = self.entry_login_matric.get().strip().upper()
-        student = next((s for s in self.students if s["matric"] == matric), None)
-        if student:
-            self.current_student = student
-            self.show_dashboard()
-            self.show_toast(f"Welcome back, {student['name'].split()[0]}!")
-        else:
-            self.show_toast("Student not found. Please register first.", is_error=True)
+        self.ensure_data()
+        try:
+            self.session = self.registry.login(self.entry_login_matric.get())
+        except RegistrationError as e:
+            self.show_toast(str(e), is_error=True)
+            return
+        self.current_student = self.session.student
+        self.show_dashboard()
+        if not self.show_notices():
+            self.show_toast(f"Welcome back, {self.current_student['name'].split()[0]}!")
 
     def handle_register(self):
+        self.ensure_data()
         raw_name = self.entry_reg_name.get()
         raw_matric = self.entry_reg_matric.get()
 
@@ -319,17 +407,14 @@ class GROUP2App(ctk.CTk):
         if not matric:
             return
 
-        new_student = {
-            "name": name,
-            "matric": matric,
-            "registered_courses": [],
-            "total_credits": 0,
-        }
-        self.students.append(new_student)
-        self.save_data()
-        self.current_student = new_student
+        try:
+            self.session = self.registry.register(name, matric) # also rejects a matric that is already registered
+        except RegistrationError as e:
+            self.show_toast(str(e), is_error=True)
+            return
+        self.current_student = self.session.student
         self.show_dashboard()
-        self.show_toast("Account created! Add at least 12 credits.", is_error=False)
+        self.show_toast(f"Account created! Add at least {MIN_CREDITS} credits.", is_error=False)
 
     def logout(self):
         if self.current_student["total_credits"] < MIN_CREDITS:
@@ -338,60 +423,82 @@ class GROUP2App(ctk.CTk):
                 is_error=True,
             )
             return
+        self.session = None
         self.current_student = None
-        self.save_data()
+        self.saver.flush_soon()  # don't wait out the debounce, but don't block on it either
         self.show_login_screen()
 
-    def detect_clash(self, new_course):
-        for n_slot in new_course["slots"]:
-            n_day, n_time = n_slot
-            n_start_str, n_end_str = n_time.split("-")
-            n_start = int(n_start_str.split(":")[0])
-            n_end = int(n_end_str.split(":")[0])
-
-            for reg_course in self.current_student["registered_courses"]:
-                for r_slot in reg_course["slots"]:
-                    r_day, r_time = r_slot
-                    if n_day != r_day:
-                        continue
-                    r_start_str, r_end_str = r_time.split("-")
-                    r_start = int(r_start_str.split(":")[0])
-                    r_end = int(r_end_str.split(":")[0])
-
-                    if max(n_start, r_start) < min(n_end, r_end):
-                        return f"CLASH: {reg_course['code']} ({n_day} {r_time})"
-        return None
-
+    @timed("gui_add_course")
     def add_course_action(self, course):
-        if self.current_student["total_credits"] + course["credit"] > MAX_CREDITS:
-            self.show_toast(f"Exceeds {MAX_CREDITS} credit limit.", is_error=True)
-            return
-        clash = self.detect_clash(course)
-        if clash:
-            self.show_toast(clash, is_error=True)
+        try:
+            status = self.session.add(course)
+        except RegistrationError as e:
+            self.show_toast(str(e), is_error=True)
             return
-        self.current_student["registered_courses"].append(course)
-        self.current_student["total_credits"] += course["credit"]
-        self.save_data()
         self.refresh_ui()
-        self.show_toast(f"Added {course['code']}", is_error=False)
+        if status == WAITLISTED:
+            self.show_toast(f"{course['code']} is full - added to its waitlist", is_error=False)
+        else:
+            self.show_toast(f"Added {course['code']}", is_error=False)
 
+    @timed("gui_drop_course")
     def drop_course_action(self, course):
-        new_credits = self.current_student["total_credits"] - course["credit"]
-        if new_credits < MIN_CREDITS:
+        try:
+            self.session.drop(course)
+        except RegistrationError as e:
+            self.show_toast(str(e), is_error=True)
+            return
+        self.refresh_ui()
+        self.show_toast(f"Dropped {course['code']}", is_error=False)
+
+    def show_timetable_suggestions(self):
+        # keeps whatever the student already registered and fills the rest with the solver
+        options = best_timetables(
+            self.catalog, self.current_student["registered_courses"]
+        )
+        if not options:
             self.show_toast(
-                f"Cannot drop! Would fall below {MIN_CREDITS} credits.", is_error=True
+                f"No clash-free {MIN_CREDITS}-{MAX_CREDITS} credit timetable keeps your courses.",
+                is_error=True,
             )
             return
-        self.current_student["registered_courses"] = [
-            c
-            for c in self.current_student["registered_courses"]
-            if c["code"] != course["code"]
-        ]
-        self.current_student["total_credits"] = new_credits
-        self.save_data()
+
+        dialog = ctk.CTkToplevel(self)
+        dialog.title("Suggested Timetables")
+        dialog.geometry("560x480")
+        dialog.transient(self)
+        ctk.CTkLabel(
+            dialog, text="Suggested Timetables", font=("Roboto", 18, "bold")
+        ).pack(pady=(20, 10))
+        scroll = ctk.CTkScrollableFrame(dialog)
+        scroll.pack(fill="both", expand=True, padx=20, pady=(0, 20))
+        for codes in options:
+            credits, days, _ = timetable_score(self.catalog, codes)
+            card = ctk.CTkFrame(scroll, corner_radius=10, fg_color="#f8f9fa")
+            card.pack(fill="x", pady=5, padx=5)
+            ctk.CTkLabel(
+                card,
+                text=f"{credits} Cr, {-days} days\n" + ", ".join(codes),
+                font=("Roboto", 12),
+                justify="left",
+                wraplength=360,
+            ).pack(side="left", padx=10, pady=10)
+            ctk.CTkButton(
+                card,
+                text="Apply",
+                width=60,
+                command=lambda c=codes: self.apply_suggestion(dialog, c),
+            ).pack(side="right", padx=10)
+
+    def apply_suggestion(self, dialog, codes):
+        dialog.destroy()
+        try:
+            self.session.apply_timetable(codes)
+        except RegistrationError as e:
+            self.show_toast(str(e), is_error=True)
+            return
         self.refresh_ui()
-        self.show_toast(f"Dropped {course['code']}", is_error=False)
+        self.show_toast(f"Timetable applied ({len(codes)} courses).", is_error=False)
 
     def refresh_ui(self):
         if not self.current_student:
@@ -406,8 +513,6 @@ class GROUP2App(ctk.CTk):
 
         self.populate_course_lists()
         if self.timetable_container:
-            for w in self.timetable_container.winfo_children():
-                w.destroy()
             self.draw_timetable_grid(self.timetable_container)
 
     # UI GENERATION
@@ -425,8 +530,9 @@ class GROUP2App(ctk.CTk):
         ctk.CTkEntry(
             left, placeholder_text="Search...", textvariable=self.search_var
         ).pack(fill="x", padx=20, pady=5)
-        self.scroll_avail = ctk.CTkScrollableFrame(left)
-        self.scroll_avail.pack(fill="both", expand=True, padx=20, pady=10)
+        # virtualized: only the visible cards exist, however large the catalog is
+        self.list_avail = VirtualCourseList(left, on_add=self.add_course_action)
+        self.list_avail.pack(fill="both", expand=True, padx=20, pady=10)
 
         right = ctk.CTkFrame(parent)
         right.grid(row=0, column=1, sticky="nsew", padx=(10, 0))
@@ -436,24 +542,59 @@ class GROUP2App(ctk.CTk):
         self.scroll_reg = ctk.CTkScrollableFrame(right)
         self.scroll_reg.pack(fill="both", expand=True, padx=20, pady=10)
 
+        # fresh panel, so start a fresh card cache (code -> (card, button)) too
+        self.reg_cards, self.reg_shown = {}, []
         self.populate_course_lists()
 
+    @timed("gui_populate_course_lists")
     def populate_course_lists(self):
-        search = self.search_var.get().lower()
-        for w in self.scroll_avail.winfo_children() + self.scroll_reg.winfo_children():
-            w.destroy()
-        reg_codes = {c["code"] for c in self.current_student["registered_courses"]}
-        for c in self.courses_available:
-            if c["code"] not in reg_codes and (
-                not search or search in c["code"].lower() or search in c["name"].lower()
-            ):
-                self.create_course_card(self.scroll_avail, c, False)
-        for c in self.current_student["registered_courses"]:
-            self.create_course_card(self.scroll_reg, c, True)
+        matched = self.catalog.search(self.search_var.get())
+        reg_codes = set(self.current_student["registered_courses"])
+        clashing = self.catalog.blocked_codes(reg_codes)  # one pass over the conflict graph
+        self.list_avail.set_items(
+            [c for c in matched if c["code"] not in reg_codes], clashing
+        )
+        self.sync_cards(
+            self.scroll_reg,
+            self.reg_cards,
+            self.reg_shown,
+            self.catalog.resolve(self.current_student["registered_courses"]),
+            True,
+        )
+
+    # cards are built once per course and then only packed / unpacked, so an add/drop
+    # costs widget work in proportion to what actually changed
+    def sync_cards(self, parent, cards, shown, courses, is_registered):
+        wanted = [c["code"] for c in courses]
+        if wanted == shown:
+            return
+        wanted_set = set(wanted)
+        for code in shown:
+            if code not in wanted_set:
+                cards[code][0].pack_forget()
+        # cards that stay keep their relative (registration) order, so only
+        # newcomers need placing
+        shown_set = set(shown)
+        staying = [code for code in wanted if code in shown_set]
+        next_staying = 0
+        prev = None
+        for code, course in zip(wanted, courses):
+            if code not in cards:
+                cards[code] = self.create_course_card(parent, course, is_registered)
+            card = cards[code][0]
+            if code in shown_set:
+                next_staying += 1
+            elif prev is not None:
+                card.pack(fill="x", pady=5, padx=5, after=prev)
+            elif next_staying < len(staying):
+                card.pack(fill="x", pady=5, padx=5, before=cards[staying[next_staying]][0])
+            else:
+                card.pack(fill="x", pady=5, padx=5)
+            prev = card
+        shown[:] = wanted
 
     def create_course_card(self, parent, course, is_registered):
         card = ctk.CTkFrame(parent, corner_radius=10, fg_color="#f8f9fa")
-        card.pack(fill="x", pady=5, padx=5)
         info = ctk.CTkFrame(card, fg_color="transparent")
         info.pack(side="left", padx=10, pady=10, fill="both", expand=True)
         ctk.CTkLabel(info, text=course["code"], font=("Roboto", 14, "bold")).pack(
@@ -474,75 +615,34 @@ class GROUP2App(ctk.CTk):
             ),
         )
         btn.pack(side="right", padx=10)
+        return card, btn
 
     def setup_timetable_tab(self, parent):
-        self.timetable_container = ctk.CTkScrollableFrame(parent)
+        self.timetable_container = TimetableCanvas(
+            parent, days=DAYS[:5], hours=range(8, 18)  # 8:00 to 17:00 (10 columns)
+        )
         self.timetable_container.pack(fill="both", expand=True, padx=10, pady=10)
         self.draw_timetable_grid(self.timetable_container)
 
+    @timed("gui_draw_timetable_grid")
     def draw_timetable_grid(self, container):
-        days = ["Monday", "Tuesday", "Wednesday", "Thursday", "Friday"]
-        hours = list(range(8, 18))  # 8:00 to 17:00 (10 columns)
-
-        # Configure container grid: equal weight for day rows
-        container.grid_columnconfigure(
-            tuple(range(1, len(hours) + 1)), weight=1, uniform="hour"
-        )
-        for r in range(1, len(days) + 1):  # rows for days
-            container.grid_rowconfigure(r, weight=1, uniform="day")
-
-        # Time headers (top row)
-        ctk.CTkLabel(container, text="", width=100).grid(
-            row=0, column=0
-        )  # empty corner
-        for i, h in enumerate(hours):
-            ctk.CTkLabel(
-                container, text=f"{h:02d}:00", font=("Roboto", 11, "bold")
-            ).grid(row=0, column=i + 1, padx=5, sticky="ew")
-
-        # Build grid: day labels + cells
-        for r, day in enumerate(days, start=1):
-            ctk.CTkLabel(container, text=day, font=("Roboto", 12, "bold")).grid(
-                row=r, column=0, padx=10, pady=20, sticky="w"
-            )
-            for c in range(len(hours)):
-                # empty cell: no fixed height, will match row height
-                empty_cell = ctk.CTkFrame(
-                    container, fg_color="#f0f0f0", corner_radius=6
+        # hands the canvas the full set of blocks; it only redraws the ones that changed
+        blocks = {}
+        for code in self.current_student["registered_courses"]:
+            course = self.catalog.get(code)
+            if course is None:
+                continue
+            # colour follows the course, not its position, so a drop doesn't repaint the rest
+            color = COURSE_COLORS[self.catalog.index[code] % len(COURSE_COLORS)]
+            for day_index, start, end in self.catalog.slots[code]:
+                blocks[(code, day_index, start, end)] = (
+                    f"{code}\n{course['location']}",
+                    color,
                 )
-                empty_cell.grid(row=r, column=c + 1, padx=1, pady=1, sticky="nsew")
-
-        # Place registered courses on top
-        for idx, course in enumerate(self.current_student["registered_courses"]):
-            color = COURSE_COLORS[idx % len(COURSE_COLORS)]
-            for slot in course["slots"]:
-                day, time_range = slot
-                if day not in days:
-                    continue
-                start_h = int(time_range.split("-")[0].split(":")[0])
-                end_h = int(time_range.split("-")[1].split(":")[0])
-                duration_hours = end_h - start_h
-
-                block = ctk.CTkFrame(container, fg_color=color, corner_radius=10)
-                block.grid(
-                    row=days.index(day) + 1,
-                    column=(start_h - 8) + 1,
-                    columnspan=duration_hours,
-                    sticky="nsew",
-                    padx=4,
-                    pady=8,
-                )
-
-                # Course info label
-                ctk.CTkLabel(
-                    block,
-                    text=f"{course['code']}\n{course['location']}",
-                    font=("Roboto", 10, "bold"),
-                    text_color="#333333",
-                    justify="center",
-                ).place(relx=0.5, rely=0.5, anchor="center")
+        container.update_blocks(blocks)
 
 
 if __name__ == "__main__":
+    METRICS.start()
     app = GROUP2App()
     app.mainloop()
@@ -0,0 +1,227 @@
+import tkinter as tk
+
+import customtkinter as ctk
+
+ROW_HEIGHT = 72  # pixels per course card, gap included
+ROW_GAP = 10
+
+
+# VIRTUALIZED COURSE LIST
+# only the cards that fit in the visible window exist. scrolling moves a pixel offset
+# over the full list and re-labels the same pooled cards, so the widget count stays
+# at (window height / ROW_HEIGHT) + 2 no matter how many courses are listed
+class VirtualCourseList(ctk.CTkFrame):
+    def __init__(self, master, on_add, **kwargs):
+        super().__init__(master, **kwargs)
+        self.on_add = on_add
+        self.items = []  # course dicts, in display order
+        self.clashing = set()
+        self.offset = 0  # pixels scrolled from the top of the full list
+        self.rows = []  # pooled cards: dicts of widgets plus the code each one shows
+        # <MouseWheel> delta per notch: 120 on Windows (and X11 from Tk 8.7), about 1
+        # on macOS, where a trackpad flick sends many small deltas
+        self.wheel_unit = 1 if self.tk.call("tk", "windowingsystem") == "aqua" else 120
+
+        self.viewport = ctk.CTkFrame(self, fg_color="transparent")
+        self.viewport.pack(side="left", fill="both", expand=True)
+        self.scrollbar = ctk.CTkScrollbar(self, command=self.on_scrollbar)
+        self.scrollbar.pack(side="right", fill="y")
+        self.viewport.bind("<Configure>", lambda event: self.resize_pool())
+        self.bind_wheel(self.viewport)
+
+    def bind_wheel(self, widget):
+        widget.bind("<MouseWheel>", self.on_wheel)  # Windows / macOS
+        widget.bind("<Button-4>", lambda event: self.scroll_notches(-1))  # X11 up
+        widget.bind("<Button-5>", lambda event: self.scroll_notches(1))  # X11 down
+
+    # DATA
+    def set_items(self, items, clashing=()):
+        self.items = items
+        self.clashing = set(clashing)
+        for row in self.rows:
+            row["code"] = None  # contents (or clash state) may differ, relabel on render
+        self.scroll_to(self.offset)
+
+    # SCROLLING
+    def max_offset(self):
+        return max(0, len(self.items) * ROW_HEIGHT - self.viewport.winfo_height())
+
+    def scroll_to(self, offset):
+        self.offset = int(min(max(offset, 0), self.max_offset()))
+        self.render()
+
+    def scroll_by(self, pixels):
+        self.scroll_to(self.offset + pixels)
+
+    def scroll_notches(self, notches):
+        self.scroll_by(notches * ROW_HEIGHT / 2)
+
+    def on_wheel(self, event):
+        self.scroll_notches(-event.delta / self.wheel_unit)
+
+    def on_scrollbar(self, action, amount, unit=None):
+        total = len(self.items) * ROW_HEIGHT
+        if action == "moveto":
+            self.scroll_to(float(amount) * total)
+        elif unit == "pages":
+            self.scroll_by(int(amount) * self.viewport.winfo_height())
+        else:
+            self.scroll_by(int(amount) * ROW_HEIGHT)
+
+    # POOL
+    def resize_pool(self):
+        needed = self.viewport.winfo_height() // ROW_HEIGHT + 2
+        while len(self.rows) < needed:
+            self.rows.append(self.create_row())
+        self.scroll_to(self.offset)
+
+    def create_row(self):
+        card = ctk.CTkFrame(self.viewport, corner_radius=10, fg_color="#f8f9fa")
+        info = ctk.CTkFrame(card, fg_color="transparent")
+        info.pack(side="left", padx=10, pady=6, fill="both", expand=True)
+        code_label = ctk.CTkLabel(info, text="", font=("Roboto", 14, "bold"))
+        code_label.pack(anchor="w")
+        name_label = ctk.CTkLabel(info, text="", font=("Roboto", 12))
+        name_label.pack(anchor="w")
+        button = ctk.CTkButton(card, text="Add", width=60, fg_color="#27ae60")
+        button.pack(side="right", padx=10)
+        for widget in (card, info, code_label, name_label, button):
+            self.bind_wheel(widget)
+        return {
+            "card": card,
+            "code_label": code_label,
+            "name_label": name_label,
+            "button": button,
+            "code": None,
+        }
+
+    def render(self):
+        first = self.offset // ROW_HEIGHT
+        shift = self.offset % ROW_HEIGHT
+        for k, row in enumerate(self.rows):
+            index = first + k
+            if index >= len(self.items):
+                row["card"].place_forget()
+                row["code"] = None
+                continue
+            course = self.items[index]
+            if row["code"] != course["code"]:
+                self.fill_row(row, course)
+            row["card"].place(
+                x=0, y=k * ROW_HEIGHT - shift, relwidth=1, height=ROW_HEIGHT - ROW_GAP
+            )
+        total = len(self.items) * ROW_HEIGHT
+        if total:
+            view = self.viewport.winfo_height()
+            self.scrollbar.set(self.offset / total, min(1.0, (self.offset + view) / total))
+        else:
+            self.scrollbar.set(0.0, 1.0)
+
+    def fill_row(self, row, course):
+        row["code"] = course["code"]
+        row["code_label"].configure(text=course["code"])
+        row["name_label"].configure(text=f"{course['name']} ({course['credit']} Cr)")
+        if course["code"] in self.clashing:  # adding it would fail anyway
+            row["button"].configure(
+                text="Clash", state="disabled", fg_color="#bdc3c7", command=None
+            )
+        else:
+            row["button"].configure(
+                text="Add",
+                state="normal",
+                fg_color="#27ae60",
+                command=lambda c=course: self.on_add(c),
+            )
+
+
+# SINGLE-CANVAS TIMETABLE
+# the grid is drawn once per size change; each course slot is one rectangle + one
+# text item tagged with its key, so an add/drop only deletes / draws the blocks
+# that actually changed instead of rebuilding dozens of widgets
+class TimetableCanvas(ctk.CTkFrame):
+    HEADER_HEIGHT = 30
+    LABEL_WIDTH = 100
+
+    def __init__(self, master, days, hours, **kwargs):
+        super().__init__(master, **kwargs)
+        self.days = days
+        self.hours = hours  # e.g. range(8, 18): one column per hour
+        self.blocks = {}  # key -> (text, color) currently on the canvas
+        self.canvas = tk.Canvas(self, highlightthickness=0, background="#ffffff")
+        self.canvas.pack(fill="both", expand=True)
+        self.canvas.bind("<Configure>", lambda event: self.redraw())
+
+    def cell_size(self):
+        width = max(self.canvas.winfo_width() - self.LABEL_WIDTH, len(self.hours))
+        height = max(self.canvas.winfo_height() - self.HEADER_HEIGHT, len(self.days))
+        return width / len(self.hours), height / len(self.days)
+
+    def redraw(self):
+        # full repaint, only on resize
+        self.canvas.delete("all")
+        self.draw_grid()
+        for key, (text, color) in self.blocks.items():
+            self.draw_block(key, text, color)
+
+    def draw_grid(self):
+        col_w, row_h = self.cell_size()
+        for i, h in enumerate(self.hours):
+            x = self.LABEL_WIDTH + i * col_w
+            self.canvas.create_text(
+                x + col_w / 2,
+                self.HEADER_HEIGHT / 2,
+                text=f"{h:02d}:00",
+                font=("Roboto", 11, "bold"),
+                tags="grid",
+            )
+        for r, day in enumerate(self.days):
+            y = self.HEADER_HEIGHT + r * row_h
+            self.canvas.create_text(
+                10, y + row_h / 2, text=day, anchor="w", font=("Roboto", 12, "bold"), tags="grid"
+            )
+            for i in range(len(self.hours)):
+                x = self.LABEL_WIDTH + i * col_w
+                self.canvas.create_rectangle(
+                    x + 1, y + 1, x + col_w - 1, y + row_h - 1,
+                    fill="#f0f0f0", outline="", tags="grid",
+                )
+
+    def draw_block(self, key, text, color):
+        day_index, start, end = key[1:]
+        col_w, row_h = self.cell_size()
+        first = self.hours[0] * 60
+        last = (self.hours[-1] + 1) * 60
+        start, end = max(start, first), min(end, last)
+        if start >= end or day_index >= len(self.days):
+            return
+        x0 = self.LABEL_WIDTH + (start - first) / 60 * col_w
+        x1 = self.LABEL_WIDTH + (end - first) / 60 * col_w
+        y0 = self.HEADER_HEIGHT + day_index * row_h
+        tag = self.tag_of(key)
+        self.canvas.create_rectangle(
+            x0 + 4, y0 + 8, x1 - 4, y0 + row_h - 8, fill=color, outline="", tags=tag
+        )
+        self.canvas.create_text(
+            (x0 + x1) / 2,
+            y0 + row_h / 2,
+            text=text,
+            font=("Roboto", 10, "bold"),
+            fill="#333333",
+            justify="center",
+            width=max(x1 - x0 - 8, 1),
+            tags=tag,
+        )
+
+    @staticmethod
+    def tag_of(key):
+        return "block:" + ":".join(str(part) for part in key)
+
+    def update_blocks(self, blocks):
+        # blocks: (code, day_index, start_min, end_min) -> (text, color)
+        for key in self.blocks.keys() - blocks.keys():
+            self.canvas.delete(self.tag_of(key))
+        for key, value in blocks.items():
+            if self.blocks.get(key) != value:
+                self.canvas.delete(self.tag_of(key))
+                self.draw_block(key, *value)
+        self.blocks = dict(blocks)